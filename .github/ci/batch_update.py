@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Run many package updaters in a single process.
+
+Each ``packages/<name>/update.py`` is imported as a module and its
+``main()`` is called on a bounded thread pool, so all updaters share one
+Python startup, one HTTP connection pool and the on-disk caches instead
+of paying for a cold ``nix shell`` shebang per package. Network-bound work
+(version lookups, downloads, prefetches) runs concurrently, while Nix
+builds are serialized through ``updater.nix.BUILD_LOCK``. Packages without
+an update script fall back to nix-update, also under that lock.
+
+Updaters write dummy and intermediate hashes into the working tree while
+they run, and a package built on another package of this flake (e.g.
+claudebox on ``perSystem.self.claude-code``) would evaluate those. Such a
+package is therefore only started once every package it uses from the
+batch has finished.
+
+Output of each updater is buffered and printed as one block when it
+finishes. Results are written (to GITHUB_OUTPUT, or logged) as a single
+``results`` JSON object mapping each package to the same
+``updated``/``new_version``/``changelog`` keys that update.py emits.
+
+Usage:
+  batch_update.py [--jobs N] [package ...]
+
+Without package names, every package that has an update.py is updated.
+Exits non-zero if any updater failed.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import traceback
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TextIO
+
+from lib import (
+    load_nix_update_args,
+    load_update_script,
+    package_metadata,
+    run,
+    write_output,
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from updater import batched_release_lookups
+from updater.nix import BUILD_LOCK
+
+log = logging.getLogger(__name__)
+
+PACKAGES_DIR = Path("packages")
+
+# Updaters run concurrently; most time is spent waiting on the network.
+DEFAULT_JOBS = 8
+
+# References to other packages of the flake in a package's Nix files.
+_SELF_ATTR = re.compile(r"perSystem\.self\.([\w-]+)")
+_SELF_INHERIT = re.compile(r"inherit\s*\(\s*perSystem\.self\s*\)([^;]*);")
+
+
+@dataclass(frozen=True, slots=True)
+class PackageResult:
+    """Outcome of updating a single package."""
+
+    name: str
+    updated: bool
+    new_version: str = ""
+    changelog: str = ""
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, str]:
+        """Convert to the key/value pairs update.py writes to GITHUB_OUTPUT."""
+        if not self.updated:
+            return {"updated": "false"}
+        return {
+            "updated": "true",
+            "new_version": self.new_version,
+            "changelog": self.changelog,
+        }
+
+
+class _ThreadOutput(io.TextIOBase):
+    """Route writes to a per-thread buffer when one is active."""
+
+    def __init__(self, fallback: TextIO) -> None:
+        self._fallback = fallback
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def capture(self) -> Iterator[io.StringIO]:
+        """Buffer everything the current thread writes."""
+        buffer = io.StringIO()
+        self._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, s: str) -> int:
+        buffer: io.StringIO | None = getattr(self._local, "buffer", None)
+        return (buffer or self._fallback).write(s)
+
+    def flush(self) -> None:
+        self._fallback.flush()
+
+
+def discover_updaters() -> list[str]:
+    """Return the names of all packages that have an update script."""
+    return sorted(p.parent.name for p in PACKAGES_DIR.glob("*/update.py"))
+
+
+def package_dependencies(names: list[str]) -> dict[str, set[str]]:
+    """Return, for each package, the other packages in ``names`` it builds on."""
+    batch = set(names)
+    deps: dict[str, set[str]] = {}
+    for name in names:
+        used: set[str] = set()
+        for nix_file in (PACKAGES_DIR / name).glob("*.nix"):
+            text = nix_file.read_text()
+            used.update(_SELF_ATTR.findall(text))
+            for inherited in _SELF_INHERIT.findall(text):
+                used.update(inherited.split())
+        deps[name] = (used & batch) - {name}
+    return deps
+
+
+def load_updater(name: str) -> Callable[[], None]:
+    """Import ``packages/<name>/update.py`` and return its ``main``."""
+    main: Callable[[], None] = load_update_script(name).main
+    return main
+
+
+def run_nix_update(name: str) -> None:
+    """Update a package without an update script using nix-update."""
+    result = subprocess.run(
+        ["nix-update", "--flake", name, *load_nix_update_args(name)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        check=False,
+    )
+    print(result.stdout, end="")
+    if result.returncode != 0:
+        msg = f"nix-update failed for package {name}"
+        raise RuntimeError(msg)
+
+
+def run_updater(name: str) -> None:
+    """Run the updater for ``name`` in the current thread."""
+    if (PACKAGES_DIR / name / "update.py").exists():
+        load_updater(name)()
+    else:
+        print("No update script found, trying nix-update...")
+        with BUILD_LOCK:
+            run_nix_update(name)
+
+
+def package_has_changes(name: str) -> bool:
+    """Check if the package directory has uncommitted changes."""
+    cmd = ["git", "diff", "--quiet", "--", str(PACKAGES_DIR / name)]
+    return run(cmd, check=False).returncode != 0
+
+
+def update_package(name: str, output: _ThreadOutput) -> tuple[str, str | None]:
+    """Run one updater with its output captured.
+
+    Returns:
+        The captured output and an error message if the updater failed
+
+    """
+    error: str | None = None
+    with output.capture() as buffer:
+        print(f"Updating package {name}...")
+        try:
+            run_updater(name)
+        except SystemExit as e:
+            if e.code not in {0, None}:
+                error = f"Update script exited with status {e.code}"
+        except Exception as e:  # noqa: BLE001 - one updater must not stop the batch
+            traceback.print_exc(file=buffer)
+            error = f"{type(e).__name__}: {e}"
+    return buffer.getvalue(), error
+
+
+def collect_results(errors: dict[str, str | None]) -> list[PackageResult]:
+    """Inspect the working tree and flake for the outcome of each update.
+
+    The metadata of all changed packages is read with a single evaluation.
+    """
+    changed = [
+        name
+        for name, error in errors.items()
+        if error is None and package_has_changes(name)
+    ]
+    metadata = package_metadata(changed) if changed else {}
+
+    results = []
+    for name, error in errors.items():
+        if name not in metadata:
+            results.append(PackageResult(name=name, updated=False, error=error))
+            continue
+        new_version, changelog = metadata[name]
+        if not changelog:
+            log.warning("::warning::Package %s is missing meta.changelog", name)
+        results.append(
+            PackageResult(
+                name=name, updated=True, new_version=new_version, changelog=changelog
+            )
+        )
+    return results
+
+
+def update_packages(names: list[str], jobs: int) -> list[PackageResult]:
+    """Update ``names`` concurrently and return their results in order.
+
+    A package starts only after the packages it builds on have finished
+    (see :func:`package_dependencies`), so it never evaluates their dummy
+    or half-written hashes.
+    """
+    output = _ThreadOutput(sys.stdout)
+    errors: dict[str, str | None] = {}
+    waiting = package_dependencies(names)
+    running: dict[Future[tuple[str, str | None]], str] = {}
+    with (
+        contextlib.redirect_stdout(output),
+        batched_release_lookups(),
+        ThreadPoolExecutor(max_workers=jobs) as pool,
+    ):
+        while waiting or running:
+            unfinished = waiting.keys() | set(running.values())
+            ready = [name for name, deps in waiting.items() if not deps & unfinished]
+            if not ready and not running:
+                log.warning("Dependency cycle among %s", ", ".join(sorted(waiting)))
+                ready = list(waiting)
+            for name in ready:
+                del waiting[name]
+                running[pool.submit(update_package, name, output)] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                text, errors[name] = future.result()
+                output.write(f"::group::{name}\n{text}::endgroup::\n")
+                if errors[name]:
+                    log.error("::error::Update failed for package %s", name)
+
+    # Evaluating after all updaters finished sees every hashes.json at once
+    # and keeps Nix evaluation out of the concurrent phase.
+    return collect_results({name: errors[name] for name in names})
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "packages", nargs="*", help="packages to update (default: all updaters)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"number of concurrent updaters (default: {DEFAULT_JOBS})",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Entry point: run updaters concurrently and report their results."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = parse_args()
+    os.environ["NIX_PATH"] = "nixpkgs=flake:nixpkgs"
+
+    names = args.packages or discover_updaters()
+    log.info("Updating %d package(s) with %d worker(s)", len(names), args.jobs)
+    results = update_packages(names, args.jobs)
+
+    log.info("")
+    log.info("=== Results ===")
+    for result in results:
+        if result.error:
+            log.info("  %s: failed (%s)", result.name, result.error)
+        elif result.updated:
+            log.info("  %s: %s", result.name, result.new_version)
+    write_output(
+        "results",
+        json.dumps(
+            {result.name: result.to_dict() for result in results},
+            separators=(",", ":"),
+        ),
+    )
+
+    if any(result.error for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
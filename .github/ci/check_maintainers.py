@@ -9,36 +9,69 @@ grandfathered; this only guards new contributions.
 On GitHub's ``pull_request`` event the checked-out HEAD is the synthetic
 merge of the PR into the base branch, so ``head - base`` is exactly the
 set of packages the PR introduces, regardless of how stale the PR branch
-is. The check evaluates two flakes side by side via
-``builtins.getFlake`` so it stays cheap (no builds).
+is.
+
+By default the candidates are first derived from git: packages whose
+``packages/<name>/`` directory is new on head. Only those attributes are
+evaluated, and only on head. When the diff touches shared infrastructure
+(see SHARED_PATHS), which can add or rename attributes without a new
+package directory, or with ``--full``, the full two-flake comparison runs
+instead. The check evaluates two flakes side by side via
+``builtins.getFlake`` so it stays cheap (no builds). The two evaluations
+run concurrently as separate nix processes, and the base result is cached
+on disk by base commit SHA, so successive PRs against the same base only
+evaluate their head.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import logging
 import os
 import subprocess
 import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import cast
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from updater.cache import atomic_write_bytes, cache_dir, cache_enabled, evict_lru
+
 log = logging.getLogger("check-maintainers")
 
+# Base-branch results kept on disk; one per recent base commit and system.
+BASE_CACHE_ENTRIES = 32
+
+# Changes under these paths can change the package set without adding a
+# packages/<name>/ directory, so they require the full comparison.
+SHARED_PATHS = ("lib/", "overlays/", "flake.nix", "flake.lock")
+
+# Files whose addition introduces a package directory.
+PACKAGE_FILES = ("package.nix", "default.nix")
+
 # Nix expression: for one flake, return { <pkg> = <maintainer-count>; }.
 # Hidden helper packages (passthru.hideFromDocs) are skipped — they are
 # internal infra (hooks, go-bin, etc.) and not subject to this policy.
+# CHECK_NAMES optionally restricts the evaluation to a JSON list of names.
 # Inputs come in via env vars because `nix eval --expr` does not accept
 # --argstr.
 EXPR = r"""
 let
   path = builtins.getEnv "CHECK_FLAKE_PATH";
   system = builtins.getEnv "CHECK_SYSTEM";
+  names = builtins.fromJSON (builtins.getEnv "CHECK_NAMES");
   flake = builtins.getFlake path;
-  pkgs = flake.packages.${system} or { };
+  allPkgs = flake.packages.${system} or { };
   lib = flake.inputs.nixpkgs.lib;
+  pkgs =
+    if names == null then
+      allPkgs
+    else
+      lib.getAttrs (builtins.filter (name: allPkgs ? ${name}) names) allPkgs;
   isHidden = pkg: (builtins.tryEval (pkg.passthru.hideFromDocs or false)).value or false;
   count =
     name: pkg:
@@ -51,11 +84,14 @@ lib.filterAttrs (_: v: v != null) (builtins.mapAttrs count pkgs)
 """
 
 
-def nix_eval_counts(flake_dir: Path, system: str) -> dict[str, int]:
-    """Evaluate maintainer counts for one flake."""
+def nix_eval_counts(
+    flake_dir: Path, system: str, names: list[str] | None = None
+) -> dict[str, int]:
+    """Evaluate maintainer counts for one flake, optionally only for ``names``."""
     env = {
         "CHECK_FLAKE_PATH": str(flake_dir.resolve()),
         "CHECK_SYSTEM": system,
+        "CHECK_NAMES": json.dumps(names),
     }
     cmd = ["nix", "eval", "--impure", "--json", "--expr", EXPR]
     out = subprocess.run(
@@ -64,6 +100,45 @@ def nix_eval_counts(flake_dir: Path, system: str) -> dict[str, int]:
     return cast("dict[str, int]", json.loads(out))
 
 
+def _base_cache_path(base_sha: str, system: str) -> Path:
+    """Return the cache file for a base result; EXPR changes invalidate it."""
+    expr_digest = hashlib.sha256(EXPR.encode()).hexdigest()[:12]
+    return cache_dir("maintainers") / f"{base_sha}-{system}-{expr_digest}.json"
+
+
+def load_base_counts(base_sha: str, system: str) -> dict[str, int] | None:
+    """Return the cached maintainer counts of a base commit, if any.
+
+    A missing, unreadable or corrupt entry counts as a miss, so the base is
+    evaluated again and the entry rewritten.
+    """
+    if not cache_enabled():
+        return None
+    path = _base_cache_path(base_sha, system)
+    try:
+        counts = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        if path.exists():
+            log.warning("Ignoring unreadable base cache %s: %s", path, e)
+        return None
+    if not isinstance(counts, dict) or not all(
+        isinstance(name, str) and isinstance(count, int)
+        for name, count in counts.items()
+    ):
+        log.warning("Ignoring malformed base cache %s", path)
+        return None
+    return cast("dict[str, int]", counts)
+
+
+def store_base_counts(base_sha: str, system: str, counts: dict[str, int]) -> None:
+    """Cache the maintainer counts of a base commit."""
+    if not cache_enabled():
+        return
+    path = _base_cache_path(base_sha, system)
+    atomic_write_bytes(path, json.dumps(counts, sort_keys=True).encode())
+    evict_lru(path.parent, max_entries=BASE_CACHE_ENTRIES)
+
+
 def git(*args: str, cwd: Path | None = None) -> str:
     """Run git and return stdout."""
     return subprocess.run(
@@ -71,20 +146,77 @@ def git(*args: str, cwd: Path | None = None) -> str:
     ).stdout.strip()
 
 
-def prepare_base_worktree(repo: Path, base_ref: str) -> Path:
-    """Create a detached worktree at ``base_ref`` for evaluation.
+def added_package_dirs(repo: Path, base_sha: str) -> list[str] | None:
+    """Return packages whose directory is new on HEAD relative to ``base_sha``.
+
+    Returns:
+        Sorted candidate package names, or None when the diff touches
+        SHARED_PATHS and only a full comparison can tell what is new
+
+    """
+    changed = git(
+        "diff", "--name-status", "--no-renames", base_sha, "HEAD", cwd=repo
+    ).splitlines()
+    base_dirs = set(
+        git("ls-tree", "--name-only", base_sha, "packages/", cwd=repo).splitlines()
+    )
+
+    names: set[str] = set()
+    for line in changed:
+        status, _, path = line.partition("\t")
+        if path.startswith(SHARED_PATHS):
+            log.info("%s changed, falling back to the full comparison", path)
+            return None
+        parts = path.split("/")
+        if (
+            status == "A"
+            and len(parts) == 3  # noqa: PLR2004 - packages/<name>/<file>
+            and parts[0] == "packages"
+            and parts[2] in PACKAGE_FILES
+            and f"packages/{parts[1]}" not in base_dirs
+        ):
+            names.add(parts[1])
+    return sorted(names)
+
+
+def prepare_base_worktree(repo: Path, base_sha: str) -> Path:
+    """Create a detached worktree at ``base_sha`` for evaluation.
 
     Using a worktree (rather than ``git archive`` or evaluating
     ``github:owner/repo/<sha>``) keeps the flake input cache warm and
     avoids re-downloading nixpkgs for the base revision.
     """
-    base_sha = git("rev-parse", base_ref, cwd=repo)
-    log.info("base ref %s -> %s", base_ref, base_sha[:12])
     tmp = Path(tempfile.mkdtemp(prefix="maint-base-"))
     git("worktree", "add", "--detach", str(tmp), base_sha, cwd=repo)
     return tmp
 
 
+def eval_head_and_base(
+    repo: Path, base_sha: str, system: str
+) -> tuple[dict[str, int], dict[str, int]]:
+    """Evaluate maintainer counts on head and base.
+
+    The base result comes from the cache when possible. Otherwise both
+    flakes are evaluated concurrently, each in its own nix process, and
+    the base result is cached for later runs.
+    """
+    base = load_base_counts(base_sha, system)
+    if base is not None:
+        log.info("Using cached base result for %s", base_sha[:12])
+        return nix_eval_counts(repo, system), base
+
+    base_dir = prepare_base_worktree(repo, base_sha)
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            head_future = pool.submit(nix_eval_counts, repo, system)
+            base_future = pool.submit(nix_eval_counts, base_dir, system)
+            head, base = head_future.result(), base_future.result()
+    finally:
+        git("worktree", "remove", "--force", str(base_dir), cwd=repo)
+    store_base_counts(base_sha, system, base)
+    return head, base
+
+
 def main() -> int:
     """Evaluate both flakes and fail on new packages with no maintainers."""
     logging.basicConfig(level=logging.INFO, format="%(message)s")
@@ -100,17 +232,28 @@ def main() -> int:
         default="x86_64-linux",
         help="Platform to evaluate packages for.",
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Always compare the full package sets of both flakes.",
+    )
     args = parser.parse_args()
 
     repo = Path.cwd()
-    base_dir = prepare_base_worktree(repo, args.base_ref)
-    try:
-        head = nix_eval_counts(repo, args.system)
-        base = nix_eval_counts(base_dir, args.system)
-    finally:
-        git("worktree", "remove", "--force", str(base_dir), cwd=repo)
+    base_sha = git("rev-parse", args.base_ref, cwd=repo)
+    log.info("base ref %s -> %s", args.base_ref, base_sha[:12])
+
+    candidates = None if args.full else added_package_dirs(repo, base_sha)
+    if candidates is None:
+        head, base = eval_head_and_base(repo, base_sha, args.system)
+        new = sorted(set(head) - set(base))
+    elif candidates:
+        log.info("Candidate new packages: %s", ", ".join(candidates))
+        head = nix_eval_counts(repo, args.system, candidates)
+        new = sorted(head)
+    else:
+        new = []
 
-    new = sorted(set(head) - set(base))
     if not new:
         log.info("No new packages in this PR.")
         return 0
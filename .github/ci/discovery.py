@@ -3,19 +3,43 @@
 
 Discovers all packages with version attributes and all flake inputs,
 outputting a matrix JSON suitable for GitHub Actions.
+
+When discovering all packages, updaters that define a cheap ``check()``
+(returning the current and latest version without touching the Nix store)
+are queried concurrently over one shared HTTP session, and packages that
+are already up to date are left out of the matrix. Packages without
+``check()``, or whose check fails, are always kept. Set CHECK_VERSIONS=0 to
+disable this pruning.
+
+With CHANGED_SINCE set to a git diff range (e.g. ``origin/main...HEAD`` or
+a single revision), only packages whose ``packages/<name>/`` files changed
+in that range are evaluated. A change to a path that every package depends
+on (see GLOBAL_PATHS) widens discovery to all packages again.
 """
 
 import json
 import logging
 import os
 import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
-from lib import write_output
+from lib import load_update_script, write_output
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from updater import batched_release_lookups, should_update
 
 log = logging.getLogger(__name__)
 
+# Version checks are plain HTTP requests; run plenty of them at once.
+CHECK_WORKERS = 16
+
+# Changes under these paths can affect every package's evaluation.
+GLOBAL_PATHS = ("lib/", "overlays/", "patches/", "flake.nix", "flake.lock")
+
 NIX_EXPR = """
 let
   config = builtins.fromJSON (builtins.getEnv "DISCOVERY_CONFIG");
@@ -92,6 +116,76 @@ def discover_packages(
     return items
 
 
+def affected_packages(diff_range: str) -> list[str] | None:
+    """Map the files changed in ``diff_range`` to package names.
+
+    Returns:
+        Sorted names of the affected packages that still exist, or None when
+        every package is affected (or the diff cannot be computed)
+
+    """
+    result = subprocess.run(
+        ["git", "diff", "--name-only", diff_range],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        log.warning(
+            "git diff %s failed, discovering all packages: %s",
+            diff_range,
+            result.stderr.strip(),
+        )
+        return None
+
+    names: set[str] = set()
+    for path in result.stdout.splitlines():
+        if path.startswith(GLOBAL_PATHS):
+            log.info("%s changed, discovering all packages", path)
+            return None
+        parts = path.split("/")
+        if len(parts) > 2 and parts[0] == "packages":  # noqa: PLR2004
+            names.add(parts[1])
+    # Deleted packages have nothing left to update.
+    return sorted(name for name in names if Path("packages", name).is_dir())
+
+
+def needs_update(name: str) -> bool:
+    """Ask the package's updater whether a newer version is available.
+
+    Returns True (keep the package) when there is no ``check()`` or it fails,
+    so pruning never hides an update.
+    """
+    if not Path(f"packages/{name}/update.py").exists():
+        return True
+    try:
+        module = load_update_script(name)
+        check = getattr(module, "check", None)
+        if check is None:
+            return True
+        current, latest = check()
+        compare = getattr(module, "needs_update", should_update)
+        outdated = bool(compare(current, latest))
+    except Exception as e:  # noqa: BLE001 - fall back to running the full updater
+        log.warning("Version check failed for %s: %s", name, e)
+        return True
+    log.info("  %s: %s -> %s%s", name, current, latest, "" if outdated else " (ok)")
+    return outdated
+
+
+def prune_up_to_date(items: list[MatrixItem]) -> list[MatrixItem]:
+    """Drop packages whose updater reports no newer version."""
+    log.info("Checking for new versions...")
+    with (
+        batched_release_lookups(),
+        ThreadPoolExecutor(max_workers=CHECK_WORKERS) as pool,
+    ):
+        outdated = list(pool.map(needs_update, [item.name for item in items]))
+    kept = [item for item, keep in zip(items, outdated, strict=True) if keep]
+    log.info("%d of %d package(s) may need an update", len(kept), len(items))
+    return kept
+
+
 def discover_flake_inputs(inputs_filter: list[str] | None) -> list[MatrixItem]:
     """Discover flake inputs from flake.lock."""
     log.info("Discovering flake inputs...")
@@ -149,15 +243,31 @@ def main() -> None:
 
     packages_env = os.environ.get("PACKAGES", "")
     inputs_env = os.environ.get("INPUTS", "")
+    changed_since = os.environ.get("CHANGED_SINCE", "")
     system = os.environ.get("SYSTEM", "x86_64-linux")
 
     log.info("=== Discovery Configuration ===")
     log.info("PACKAGES: %s", packages_env or "<all>")
     log.info("INPUTS: %s", inputs_env or "<all>")
+    log.info("CHANGED_SINCE: %s", changed_since or "<none>")
     log.info("")
 
+    requested = packages_env.split() or None
+    packages_filter = requested
+    if requested is None and changed_since:
+        packages_filter = affected_packages(changed_since)
+
+    if packages_filter == []:
+        log.info("No packages changed in %s", changed_since)
+        packages = []
+    else:
+        packages = discover_packages(packages_filter, system)
+    # Explicitly requested packages always run their full updater.
+    if requested is None and os.environ.get("CHECK_VERSIONS", "1") != "0":
+        packages = prune_up_to_date(packages)
+
     matrix_items = [
-        *discover_packages(packages_env.split() or None, system),
+        *packages,
         *discover_flake_inputs(inputs_env.split() or None),
     ]
 
@@ -1,13 +1,23 @@
 """Shared utilities for CI update scripts."""
 
+import importlib.util
 import logging
 import os
 import subprocess
+import sys
 from enum import StrEnum
 from pathlib import Path
+from types import ModuleType
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from updater.nix import NixCommandError, nix_eval_attrs
 
 log = logging.getLogger(__name__)
 
+# Attribute set the CI scripts evaluate package metadata from.
+PACKAGES_ATTR = ".#packages.x86_64-linux"
+
 
 class UpdateType(StrEnum):
     """Type of update: package or flake input."""
@@ -36,7 +46,51 @@ def write_output(key: str, value: str) -> None:
         log.info("output: %s=%s", key, value)
 
 
-def nix_eval_raw(expr: str) -> str | None:
-    """Evaluate a nix expression and return the raw string, or None on failure."""
-    result = run(["nix", "eval", expr, "--raw"], check=False, capture=True)
-    return result.stdout if result.returncode == 0 else None
+def package_metadata(names: list[str]) -> dict[str, tuple[str, str]]:
+    """Return the version and changelog of each package from one evaluation.
+
+    The version is "unknown" and the changelog empty when they cannot be
+    evaluated.
+    """
+    paths = [
+        f"{name}.{attr}" for name in names for attr in ("version", "meta.changelog")
+    ]
+    try:
+        values = nix_eval_attrs(PACKAGES_ATTR, paths)
+    except NixCommandError as e:
+        log.warning("Could not evaluate package metadata: %s", e)
+        values = {}
+    return {
+        name: (
+            str(values.get(f"{name}.version") or "unknown"),
+            str(values.get(f"{name}.meta.changelog") or ""),
+        )
+        for name in names
+    }
+
+
+def load_update_script(name: str) -> ModuleType:
+    """Import ``packages/<name>/update.py`` as a module without running it."""
+    path = Path(f"packages/{name}/update.py")
+    module_name = f"update_{name.replace('-', '_')}"
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    if spec is None or spec.loader is None:
+        msg = f"Cannot load update script {path}"
+        raise ImportError(msg)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_nix_update_args(name: str) -> list[str]:
+    """Load extra nix-update arguments from the package's nix-update-args file."""
+    args_file = Path(f"packages/{name}/nix-update-args")
+    if not args_file.exists():
+        return []
+    log.info("Loading nix-update args from %s", args_file)
+    return [
+        stripped
+        for line in args_file.read_text().splitlines()
+        if (stripped := line.strip()) and not stripped.startswith("#")
+    ]
@@ -15,7 +15,13 @@ import subprocess
 import sys
 from pathlib import Path
 
-from lib import UpdateType, nix_eval_raw, run, write_output
+from lib import (
+    UpdateType,
+    load_nix_update_args,
+    package_metadata,
+    run,
+    write_output,
+)
 
 log = logging.getLogger(__name__)
 
@@ -41,19 +47,6 @@ def run_update_command(cmd: list[str], error_label: str) -> None:
         sys.exit(1)
 
 
-def load_nix_update_args(name: str) -> list[str]:
-    """Load extra nix-update arguments from the package's nix-update-args file."""
-    args_file = Path(f"packages/{name}/nix-update-args")
-    if not args_file.exists():
-        return []
-    log.info("Loading nix-update args from %s", args_file)
-    return [
-        stripped
-        for line in args_file.read_text().splitlines()
-        if (stripped := line.strip()) and not stripped.startswith("#")
-    ]
-
-
 def update_package(name: str) -> None:
     """Update a single package using its update script or nix-update."""
     log.info("Updating package %s...", name)
@@ -77,11 +70,9 @@ def update_package(name: str) -> None:
         write_output("updated", "false")
         return
 
-    attr = f".#packages.x86_64-linux.{name}"
-    new_version = nix_eval_raw(f"{attr}.version") or "unknown"
+    new_version, changelog = package_metadata([name])[name]
     log.info("New version: %s", new_version)
 
-    changelog = nix_eval_raw(f"{attr}.meta.changelog") or ""
     if not changelog:
         log.warning("::warning::Package %s is missing meta.changelog", name)
 
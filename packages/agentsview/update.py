@@ -22,11 +22,17 @@ from updater.nix import NixCommandError
 HASHES_FILE = Path(__file__).parent / "hashes.json"
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest agentsview versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        "wesm", "agentsview"
+    )
+
+
 def main() -> None:
     """Update the agentsview package."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release("wesm", "agentsview")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
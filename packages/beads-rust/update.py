@@ -59,11 +59,17 @@ def prefetch_github(owner: str, repo: str, rev: str) -> str:
     return calculate_url_hash(url, unpack=True)
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest beads-rust versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        OWNER, BEADS_REPO
+    )
+
+
 def main() -> None:
     """Update beads-rust and its frankensqlite dependency."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release(OWNER, BEADS_REPO)
+    current, latest = check()
 
     print(f"beads-rust: current={current}, latest={latest}")
 
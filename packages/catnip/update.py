@@ -26,11 +26,16 @@ PLATFORMS = {
 }
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest catnip versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        "wandb", "catnip"
+    )
+
+
 def main() -> None:
     """Update the catnip package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release("wandb", "catnip")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
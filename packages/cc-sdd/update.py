@@ -10,23 +10,29 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent / "scripts"))
 
 from updater import (
     calculate_dependency_hash,
+    calculate_url_hash,
     fetch_github_latest_release,
     load_hashes,
     save_hashes,
     should_update,
 )
 from updater.hash import DUMMY_SHA256_HASH
-from updater.nix import NixCommandError, nix_prefetch_url
+from updater.nix import NixCommandError
 
 SCRIPT_DIR = Path(__file__).parent
 HASHES_FILE = SCRIPT_DIR / "hashes.json"
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest cc-sdd versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        "gotalab", "cc-sdd"
+    )
+
+
 def main() -> None:
     """Update the cc-sdd package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release("gotalab", "cc-sdd")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -41,7 +47,7 @@ def main() -> None:
         f"https://github.com/gotalab/cc-sdd/archive/refs/tags/v{latest}.tar.gz"
     )
     print("Calculating source hash...")
-    source_hash = nix_prefetch_url(tarball_url, unpack=True)
+    source_hash = calculate_url_hash(tarball_url, unpack=True)
 
     # Prepare new data with dummy hash for dependency calculation
     new_data = {
@@ -20,11 +20,14 @@ HASHES_FILE = Path(__file__).parent / "hashes.json"
 NPM_PACKAGE = "@musistudio/claude-code-router"
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest claude-code-router versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_npm_version(NPM_PACKAGE)
+
+
 def main() -> None:
     """Update the claude-code-router package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_npm_version(NPM_PACKAGE)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -47,19 +47,28 @@ def fetch_manifest(version: str) -> dict[str, object]:
     return result
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest claude-code versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_version()
+
+
+def needs_update(current: str, latest: str) -> bool:
+    """Follow the upstream `latest` pointer exactly, including downgrades.
+
+    Anthropic rolls bad releases back by repointing it (e.g. 2.1.120 was
+    yanked back to 2.1.119), and should_update() would leave us pinned to
+    the broken build.
+    """
+    return current != latest
+
+
 def main() -> None:
     """Update the claude-code package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_version()
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
-    # Follow the upstream `latest` pointer exactly, including downgrades:
-    # Anthropic rolls bad releases back by repointing it (e.g. 2.1.120 was
-    # yanked back to 2.1.119), and should_update() would leave us pinned to
-    # the broken build.
-    if current == latest:
+    if not needs_update(current, latest):
         print("Already up to date")
         return
 
@@ -67,10 +67,14 @@ def fetch_upstream_package_nix(version: str) -> str:
     return fetch_text(url)
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest claudebox versions."""
+    return get_current_version(), fetch_github_latest_release(OWNER, REPO)
+
+
 def main() -> None:
     """Update the claudebox package."""
-    current = get_current_version()
-    latest = fetch_github_latest_release(OWNER, REPO)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -22,11 +22,17 @@ from updater.nix import NixCommandError
 HASHES_FILE = Path(__file__).parent / "hashes.json"
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest cli-proxy-api versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        "router-for-me", "CLIProxyAPI"
+    )
+
+
 def main() -> None:
     """Update the cli-proxy-api package."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release("router-for-me", "CLIProxyAPI")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
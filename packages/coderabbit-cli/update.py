@@ -31,11 +31,14 @@ def fetch_version() -> str:
     return fetch_text("https://cli.coderabbit.ai/releases/latest/VERSION").strip()
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest coderabbit-cli versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_version()
+
+
 def main() -> None:
     """Update the coderabbit-cli package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_version()
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -12,8 +12,6 @@ node-version.txt from the same commit.
 import re
 import sys
 import tarfile
-import tempfile
-import urllib.request
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "scripts"))
@@ -27,48 +25,46 @@ from updater import (
     save_hashes,
     should_update,
 )
+from updater.artifacts import RUSTY_V8_PLATFORMS, RUSTY_V8_URL_TEMPLATE
+from updater.depcache import lock_from_archive
+from updater.download import cached_download
 from updater.hash import DUMMY_SHA256_HASH
-from updater.nix import NixCommandError, nix_store_prefetch_file
+from updater.nix import NixCommandError
 
 SCRIPT_DIR = Path(__file__).parent
 HASHES_FILE = SCRIPT_DIR / "hashes.json"
 OWNER = "zed-industries"
 REPO = "codex-acp"
-PLATFORMS = {
-    "x86_64-linux": "x86_64-unknown-linux-gnu",
-    "aarch64-linux": "aarch64-unknown-linux-gnu",
-    "x86_64-darwin": "x86_64-apple-darwin",
-    "aarch64-darwin": "aarch64-apple-darwin",
-}
 
 
 def extract_release_pins_from_tarball(tag: str) -> tuple[str, str, str]:
-    """Download the release tarball and extract pinned versions from Cargo.lock."""
-    url = f"https://github.com/{OWNER}/{REPO}/archive/refs/tags/{tag}.tar.gz"
+    """Extract pinned versions from Cargo.lock in the release tarball.
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tarball_path = Path(tmpdir) / "source.tar.gz"
-        urllib.request.urlretrieve(url, tarball_path)
-
-        with tarfile.open(tarball_path, "r:gz") as tar:
-            # Find Cargo.lock in the archive
-            for member in tar.getmembers():
-                if member.name.endswith("Cargo.lock"):
-                    f = tar.extractfile(member)
-                    if f is None:
-                        continue
-                    content = f.read().decode("utf-8")
-                    codex_match = re.search(
-                        r'source = "git\+https://github\.com/([^/]+)/codex\?[^"#]+#([a-f0-9]+)"',
-                        content,
+    The tarball was already downloaded to compute the source hash, so this
+    reads it back from the download cache.
+    """
+    url = f"https://github.com/{OWNER}/{REPO}/archive/refs/tags/{tag}.tar.gz"
+    tarball = cached_download(url)
+
+    with tarfile.open(tarball.path, "r:gz") as tar:
+        # Find Cargo.lock in the archive
+        for member in tar.getmembers():
+            if member.name.endswith("Cargo.lock"):
+                f = tar.extractfile(member)
+                if f is None:
+                    continue
+                content = f.read().decode("utf-8")
+                codex_match = re.search(
+                    r'source = "git\+https://github\.com/([^/]+)/codex\?[^"#]+#([a-f0-9]+)"',
+                    content,
+                )
+                v8_match = re.search(r'name = "v8"\nversion = "([^"]+)"', content)
+                if codex_match and v8_match:
+                    return (
+                        codex_match.group(1),
+                        codex_match.group(2),
+                        v8_match.group(1),
                     )
-                    v8_match = re.search(r'name = "v8"\nversion = "([^"]+)"', content)
-                    if codex_match and v8_match:
-                        return (
-                            codex_match.group(1),
-                            codex_match.group(2),
-                            v8_match.group(1),
-                        )
 
     msg = "Could not extract codex and v8 pins from Cargo.lock"
     raise ValueError(msg)
@@ -85,19 +81,23 @@ def librusty_v8_pins(
         return previous
 
     hashes = calculate_platform_hashes(
-        "https://github.com/denoland/rusty_v8/releases/download/"
-        "v{version}/librusty_v8_release_{platform}.a.gz",
-        PLATFORMS,
+        RUSTY_V8_URL_TEMPLATE,
+        RUSTY_V8_PLATFORMS,
+        immutable=True,
         version=v8_version,
     )
-    return {"version": v8_version, "hashes": {k: hashes[k] for k in PLATFORMS}}
+    return {"version": v8_version, "hashes": {k: hashes[k] for k in RUSTY_V8_PLATFORMS}}
+
+
+def check() -> tuple[str, str]:
+    """Return the current and latest codex-acp versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(OWNER, REPO)
 
 
 def main() -> None:
     """Update the codex-acp package."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release(OWNER, REPO)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -128,7 +128,7 @@ def main() -> None:
     # Calculate node-version.txt hash
     node_version_url = f"https://raw.githubusercontent.com/{codex_owner}/codex/{codex_rev}/codex-rs/node-version.txt"
     print("Calculating node-version.txt hash...")
-    node_version_hash = nix_store_prefetch_file(node_version_url)
+    node_version_hash = calculate_url_hash(node_version_url)
     print(f"  nodeVersionHash: {node_version_hash}")
 
     # Save with dummy cargoHash to calculate the real one
@@ -146,7 +146,11 @@ def main() -> None:
 
     try:
         cargo_hash = calculate_dependency_hash(
-            ".#codex-acp", "cargoHash", HASHES_FILE, data
+            ".#codex-acp",
+            "cargoHash",
+            HASHES_FILE,
+            data,
+            lock=lock_from_archive(url, "Cargo.lock"),
         )
         data["cargoHash"] = cargo_hash
         save_hashes(HASHES_FILE, data)
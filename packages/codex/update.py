@@ -24,18 +24,13 @@ from updater import (
     save_hashes,
     should_update,
 )
+from updater.artifacts import RUSTY_V8_PLATFORMS, RUSTY_V8_URL_TEMPLATE
+from updater.depcache import lock_from_archive
 from updater.hash import DUMMY_SHA256_HASH
 from updater.nix import NixCommandError
 
 HASHES_FILE = Path(__file__).parent / "hashes.json"
 
-RUSTY_V8_PLATFORMS = {
-    "x86_64-linux": "x86_64-unknown-linux-gnu",
-    "aarch64-linux": "aarch64-unknown-linux-gnu",
-    "x86_64-darwin": "x86_64-apple-darwin",
-    "aarch64-darwin": "aarch64-apple-darwin",
-}
-
 # codex-realtime-webrtc only enables livekit/webrtc-sys on macOS, so we
 # only need to prefetch the darwin prebuilt archives.
 LIVEKIT_WEBRTC_PLATFORMS = {
@@ -73,9 +68,9 @@ def librusty_v8_pins(
         return previous
 
     hashes = calculate_platform_hashes(
-        "https://github.com/denoland/rusty_v8/releases/download/"
-        "v{version}/librusty_v8_release_{platform}.a.gz",
+        RUSTY_V8_URL_TEMPLATE,
         RUSTY_V8_PLATFORMS,
+        immutable=True,
         version=v8_version,
     )
     return {"version": v8_version, "hashes": {k: hashes[k] for k in RUSTY_V8_PLATFORMS}}
@@ -111,17 +106,22 @@ def livekit_webrtc_pins(
             "https://github.com/livekit/rust-sdks/releases/download/"
             f"{webrtc_tag}/webrtc-{triple}-release.zip",
             unpack=True,
+            immutable=True,
         )
         for nix_platform, triple in LIVEKIT_WEBRTC_PLATFORMS.items()
     }
     return {"tag": webrtc_tag, "hashes": hashes}
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest codex versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_version()
+
+
 def main() -> None:
     """Update the codex package."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_version()
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -146,7 +146,11 @@ def main() -> None:
 
     try:
         cargo_hash = calculate_dependency_hash(
-            ".#codex", "cargoHash", HASHES_FILE, data
+            ".#codex",
+            "cargoHash",
+            HASHES_FILE,
+            data,
+            lock=lock_from_archive(url, "codex-rs/Cargo.lock"),
         )
         data["cargoHash"] = cargo_hash
         save_hashes(HASHES_FILE, data)
@@ -32,20 +32,28 @@ REPO = "context-hub"
 BRANCH = "main"
 
 
-def main() -> None:
-    """Update the context-hub package."""
-    data = load_hashes(HASHES_FILE)
-    current_rev = data["rev"]
-
+def check() -> tuple[str, str]:
+    """Return the pinned and latest context-hub revisions."""
     head = cast(
         "dict[str, str]",
         fetch_json(f"https://api.github.com/repos/{OWNER}/{REPO}/commits/{BRANCH}"),
     )
-    rev = head["sha"]
+    return load_hashes(HASHES_FILE)["rev"], head["sha"]
+
+
+def needs_update(current_rev: str, rev: str) -> bool:
+    """Return True when the default branch moved; revisions are not ordered."""
+    return rev != current_rev
+
+
+def main() -> None:
+    """Update the context-hub package."""
+    data = load_hashes(HASHES_FILE)
+    current_rev, rev = check()
 
     print(f"Current rev: {current_rev[:12]}, Latest rev: {rev[:12]}")
 
-    if rev == current_rev:
+    if not needs_update(current_rev, rev):
         print("Already up to date")
         return
 
@@ -16,17 +16,26 @@ from updater import (
     save_hashes,
     should_update,
 )
+from updater.depcache import lock_from_source
 from updater.hash import DUMMY_SHA256_HASH
 from updater.nix import NixCommandError
 
 HASHES_FILE = Path(__file__).parent / "hashes.json"
+# crush builds with the flake's own Go toolchain (see default.nix).
+GO_BIN_HASHES_FILE = Path(__file__).parent.parent / "go-bin" / "hashes.json"
+
+
+def check() -> tuple[str, str]:
+    """Return the current and latest crush versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        "charmbracelet", "crush"
+    )
 
 
 def main() -> None:
     """Update the crush package."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release("charmbracelet", "crush")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -48,7 +57,13 @@ def main() -> None:
 
     try:
         vendor_hash = calculate_dependency_hash(
-            ".#crush", "vendorHash", HASHES_FILE, data
+            ".#crush",
+            "vendorHash",
+            HASHES_FILE,
+            data,
+            # go mod vendor output depends on the imports in the source and
+            # on the Go toolchain, not just on go.mod/go.sum.
+            lock=lock_from_source(source_hash, GO_BIN_HASHES_FILE),
         )
         data["vendorHash"] = vendor_hash
         save_hashes(HASHES_FILE, data)
@@ -29,11 +29,16 @@ VERSION_URL = "https://cursor.com/install"
 VERSION_PATTERN = r"downloads\.cursor\.com/lab/([0-9]{4}\.[0-9]{2}\.[0-9]{2}-[a-f0-9]+)"
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest cursor-agent versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_version_from_text(
+        VERSION_URL, VERSION_PATTERN
+    )
+
+
 def main() -> None:
     """Update the cursor-agent package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_version_from_text(VERSION_URL, VERSION_PATTERN)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
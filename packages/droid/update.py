@@ -28,11 +28,16 @@ VERSION_URL = "https://app.factory.ai/cli"
 VERSION_PATTERN = r'VER="([^"]+)"'
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest droid versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_version_from_text(
+        VERSION_URL, VERSION_PATTERN
+    )
+
+
 def main() -> None:
     """Update the droid package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_version_from_text(VERSION_URL, VERSION_PATTERN)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
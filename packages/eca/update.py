@@ -10,11 +10,11 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "scripts"))
 
 from updater import (
-    calculate_url_hash,
     fetch_github_latest_release,
-    nix_eval,
+    load_hashes,
     save_hashes,
 )
+from updater.aio import calculate_url_hashes, run_sync
 
 HASHES_FILE = Path(__file__).parent / "hashes.json"
 
@@ -26,29 +26,40 @@ PLATFORMS = {
 }
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest eca versions."""
+    current = load_hashes(HASHES_FILE)["version"]
+    return current, fetch_github_latest_release("editor-code-assistant", "eca")
+
+
+def needs_update(current: str, latest: str) -> bool:
+    """Return True for any upstream change, as the updater always has."""
+    return current != latest
+
+
 def main() -> None:
     """Update the eca package."""
-    # Get current version
-    current = nix_eval(".#eca.version")
-    latest = fetch_github_latest_release("editor-code-assistant", "eca")
+    current, latest = check()
 
-    if current == latest:
+    if not needs_update(current, latest):
         print("eca is already up-to-date!")
         return
 
     print(f"Updating eca from {current} to {latest}")
 
-    hashes: dict[str, str] = {"version": latest}
-
-    for platform, url_arch in PLATFORMS.items():
-        url = f"https://github.com/editor-code-assistant/eca/releases/download/{latest}/eca-native-{url_arch}.zip"
-        print(f"Fetching hash for {platform}...")
-        hashes[platform] = calculate_url_hash(url, unpack=False)
-
+    base_url = (
+        f"https://github.com/editor-code-assistant/eca/releases/download/{latest}"
+    )
+    urls = {
+        platform: f"{base_url}/eca-native-{url_arch}.zip"
+        for platform, url_arch in PLATFORMS.items()
+    }
     # Also fetch hash for JAR file
-    jar_url = f"https://github.com/editor-code-assistant/eca/releases/download/{latest}/eca.jar"
-    print("Fetching hash for JAR...")
-    hashes["jar"] = calculate_url_hash(jar_url, unpack=False)
+    urls["jar"] = f"{base_url}/eca.jar"
+
+    print(f"Fetching hashes for {', '.join(urls)}...")
+    url_hashes = run_sync(calculate_url_hashes(urls.values(), immutable=True))
+    hashes = {"version": latest} | {key: url_hashes[url] for key, url in urls.items()}
 
     save_hashes(HASHES_FILE, hashes)
     print(f"Updated to {latest}")
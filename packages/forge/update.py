@@ -26,11 +26,16 @@ PLATFORMS = {
 }
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest forge versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        "antinomyhq", "forge"
+    )
+
+
 def main() -> None:
     """Update the forge package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release("antinomyhq", "forge")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
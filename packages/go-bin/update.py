@@ -66,6 +66,15 @@ def extract_platform_hashes(release: dict[str, Any]) -> dict[str, str]:
     return hashes
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest patch release of the tracked Go minor."""
+    current = load_hashes(HASHES_FILE)["version"]
+    release = fetch_latest_go_release(minor_version(current))
+    if release is None:
+        return current, current
+    return current, cast("str", release["version"]).removeprefix("go")
+
+
 def main() -> None:
     """Update the go-bin package."""
     data = load_hashes(HASHES_FILE)
@@ -18,16 +18,10 @@ from updater import (
     load_hashes,
     save_hashes,
 )
+from updater.artifacts import RUSTY_V8_PLATFORMS, RUSTY_V8_URL_TEMPLATE
 
 HASHES_FILE = Path(__file__).parent / "librusty_v8_hashes.json"
 
-PLATFORMS = {
-    "x86_64-linux": "x86_64-unknown-linux-gnu",
-    "aarch64-linux": "aarch64-unknown-linux-gnu",
-    "x86_64-darwin": "x86_64-apple-darwin",
-    "aarch64-darwin": "aarch64-apple-darwin",
-}
-
 
 def fetch_v8_version_from_cargo_lock(goose_version: str) -> str:
     """Extract the v8 version from goose's Cargo.lock file."""
@@ -76,8 +70,9 @@ def main() -> None:
         print("No existing hashes file, creating new one")
 
     # Calculate hashes for all platforms
-    url_template = f"https://github.com/denoland/rusty_v8/releases/download/v{v8_version}/librusty_v8_release_{{platform}}.a.gz"
-    hashes = calculate_platform_hashes(url_template, PLATFORMS)
+    hashes = calculate_platform_hashes(
+        RUSTY_V8_URL_TEMPLATE, RUSTY_V8_PLATFORMS, immutable=True, version=v8_version
+    )
 
     # Save the hashes
     save_hashes(HASHES_FILE, {"version": v8_version, "hashes": hashes})
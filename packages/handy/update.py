@@ -9,12 +9,12 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "scripts"))
 
 from updater import (
-    calculate_url_hash,
     fetch_github_latest_release,
     load_hashes,
     save_hashes,
     should_update,
 )
+from updater.aio import calculate_url_hashes, run_sync
 
 HASHES_FILE = Path(__file__).parent / "hashes.json"
 
@@ -26,11 +26,16 @@ PLATFORMS = {
 }
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest handy versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        "cjpais", "Handy"
+    )
+
+
 def main() -> None:
     """Update the handy package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release("cjpais", "Handy")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -39,11 +44,13 @@ def main() -> None:
         return
 
     base_url = f"https://github.com/cjpais/Handy/releases/download/v{latest}"
-    hashes = {}
-    for platform, filename in PLATFORMS.items():
-        url = f"{base_url}/{filename.format(version=latest)}"
-        print(f"Fetching hash for {platform}...")
-        hashes[platform] = calculate_url_hash(url)
+    urls = {
+        platform: f"{base_url}/{filename.format(version=latest)}"
+        for platform, filename in PLATFORMS.items()
+    }
+    print(f"Fetching hashes for {', '.join(urls)}...")
+    url_hashes = run_sync(calculate_url_hashes(urls.values(), immutable=True))
+    hashes = {platform: url_hashes[url] for platform, url in urls.items()}
 
     save_hashes(HASHES_FILE, {"version": latest, "hashes": hashes})
     print(f"Updated to {latest}")
@@ -10,7 +10,6 @@ commit that bumped ``packages/happy-cli/package.json`` to that version.
 
 import json
 import sys
-import urllib.request
 from pathlib import Path
 from typing import Any, cast
 
@@ -51,8 +50,7 @@ def find_release_commit(version: str) -> str:
         raw_url = (
             f"https://raw.githubusercontent.com/{MONOREPO}/{sha}/{CLI_PACKAGE_JSON}"
         )
-        with urllib.request.urlopen(raw_url, timeout=30) as resp:
-            pkg = json.loads(resp.read())
+        pkg = cast("dict[str, Any]", fetch_json(raw_url))
         if pkg.get("version") == version:
             return cast("str", sha)
 
@@ -72,11 +70,15 @@ def prefetch_github(rev: str) -> str:
     return cast("str", json.loads(result.stdout)["hash"])
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest happy-coder versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_npm_version(NPM_PACKAGE)
+
+
 def main() -> None:
     """Update the happy-coder package."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_npm_version(NPM_PACKAGE)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
     if not should_update(current, latest):
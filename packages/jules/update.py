@@ -29,11 +29,14 @@ PLATFORMS = {
 }
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest jules versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_npm_version(NPM_PACKAGE)
+
+
 def main() -> None:
     """Update the jules package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_npm_version(NPM_PACKAGE)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
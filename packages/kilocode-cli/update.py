@@ -30,11 +30,14 @@ PLATFORMS = {
 }
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest kilocode-cli versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_npm_version("@kilocode/cli")
+
+
 def main() -> None:
     """Update the kilocode-cli package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_npm_version("@kilocode/cli")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
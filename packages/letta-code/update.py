@@ -25,11 +25,15 @@ HASHES_FILE = SCRIPT_DIR / "hashes.json"
 NPM_PACKAGE = "@letta-ai/letta-code"
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest letta-code versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_npm_version(NPM_PACKAGE)
+
+
 def main() -> None:
     """Update the letta-code package."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_npm_version(NPM_PACKAGE)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -9,24 +9,28 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "scripts"))
 
 from updater import (
-    calculate_dependency_hash,
+    calculate_dependency_hashes,
     calculate_url_hash,
     fetch_github_latest_release,
     load_hashes,
-    save_hashes,
     should_update,
 )
-from updater.hash import DUMMY_SHA256_HASH
 from updater.nix import NixCommandError
 
 HASHES_FILE = Path(__file__).parent / "hashes.json"
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest oh-my-codex versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        "Yeachan-Heo", "oh-my-codex"
+    )
+
+
 def main() -> None:
     """Update the oh-my-codex package."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release("Yeachan-Heo", "oh-my-codex")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -44,32 +48,19 @@ def main() -> None:
     data = {
         "version": latest,
         "hash": source_hash,
-        "cargoHash": DUMMY_SHA256_HASH,
-        "npmDepsHash": load_hashes(HASHES_FILE)["npmDepsHash"],
+        "cargoHash": data["cargoHash"],
+        "npmDepsHash": data["npmDepsHash"],
     }
-    save_hashes(HASHES_FILE, data)
 
     try:
-        cargo_hash = calculate_dependency_hash(
-            ".#oh-my-codex.native.exploreHarness",
-            "cargoHash",
-            HASHES_FILE,
-            data,
-        )
-        data["cargoHash"] = cargo_hash
-        save_hashes(HASHES_FILE, data)
-
-        data["npmDepsHash"] = DUMMY_SHA256_HASH
-        save_hashes(HASHES_FILE, data)
-
-        npm_deps_hash = calculate_dependency_hash(
-            ".#oh-my-codex",
-            "npmDepsHash",
+        calculate_dependency_hashes(
+            {
+                "cargoHash": ".#oh-my-codex.native.exploreHarness",
+                "npmDepsHash": ".#oh-my-codex",
+            },
             HASHES_FILE,
             data,
         )
-        data["npmDepsHash"] = npm_deps_hash
-        save_hashes(HASHES_FILE, data)
     except (ValueError, NixCommandError) as e:
         print(f"Error: {e}")
         return
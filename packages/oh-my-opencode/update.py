@@ -14,13 +14,13 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "scripts"))
 
 from updater import (
+    calculate_url_hash,
     clone_and_generate_bun_nix,
     fetch_github_latest_release,
     load_hashes,
     save_hashes,
     should_update,
 )
-from updater.nix import nix_prefetch_url
 
 PKG_DIR = Path(__file__).parent
 FLAKE_ROOT = PKG_DIR.parent.parent
@@ -31,11 +31,14 @@ OWNER = "code-yeongyu"
 REPO = "oh-my-openagent"
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest oh-my-opencode versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(OWNER, REPO)
+
+
 def main() -> None:
     """Update the oh-my-opencode package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release(OWNER, REPO)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -48,7 +51,7 @@ def main() -> None:
     # Step 1: Calculate new source hash
     print("Calculating source hash...")
     url = f"https://github.com/{OWNER}/{REPO}/archive/refs/tags/v{latest}.tar.gz"
-    src_hash = nix_prefetch_url(url, unpack=True)
+    src_hash = calculate_url_hash(url, unpack=True)
     print(f"  source hash: {src_hash}")
 
     # Step 2: Update hashes.json
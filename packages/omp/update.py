@@ -60,11 +60,15 @@ def strip_workspace_entries(bun_nix: Path) -> None:
     )
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest omp versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(OWNER, REPO)
+
+
 def main() -> None:
     """Update the omp package."""
     data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release(OWNER, REPO)
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
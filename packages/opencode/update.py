@@ -27,11 +27,16 @@ PLATFORMS = {
 }
 
 
+def check() -> tuple[str, str]:
+    """Return the current and latest opencode versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_github_latest_release(
+        "anomalyco", "opencode"
+    )
+
+
 def main() -> None:
     """Update the opencode package."""
-    data = load_hashes(HASHES_FILE)
-    current = data["version"]
-    latest = fetch_github_latest_release("anomalyco", "opencode")
+    current, latest = check()
 
     print(f"Current: {current}, Latest: {latest}")
 
@@ -42,17 +42,27 @@ def hex_to_sri(hex_hash: str) -> str:
     return f"sha256-{b64}"
 
 
+def fetch_manifest() -> dict[str, Any]:
+    """Fetch the release manifest from the official source."""
+    response = fetch_json(MANIFEST_URL)
+    if not isinstance(response, dict):
+        msg = "Manifest is not a JSON object"
+        raise TypeError(msg)
+    return response
+
+
+def check() -> tuple[str, str]:
+    """Return the current and latest qoder-cli versions."""
+    return load_hashes(HASHES_FILE)["version"], fetch_manifest()["latest"]
+
+
 def main() -> None:
     """Update the qoder-cli package."""
     data = load_hashes(HASHES_FILE)
     current = data["version"]
 
     print("Fetching manifest from official source...")
-    response = fetch_json(MANIFEST_URL)
-    if not isinstance(response, dict):
-        msg = "Manifest is not a JSON object"
-        raise TypeError(msg)
-    manifest: dict[str, Any] = response
+    manifest = fetch_manifest()
     latest: str = manifest["latest"]
 
     print(f"Current: {current}, Latest: {latest}")
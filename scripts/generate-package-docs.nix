@@ -1,6 +1,12 @@
 let
   flake = builtins.getFlake (toString ./..);
-  packages = builtins.attrNames (flake.packages.x86_64-linux);
+  # Optional JSON list of package names to evaluate instead of all of them
+  namesEnv = builtins.getEnv "PACKAGE_DOCS_NAMES";
+  packages =
+    if namesEnv == "" then
+      builtins.attrNames (flake.packages.x86_64-linux)
+    else
+      builtins.fromJSON namesEnv;
 
   extractMetadata =
     pkg:
@@ -1,19 +1,80 @@
 #!/usr/bin/env python3
-"""Generate markdown documentation for all packages and update README.md."""
+"""Generate markdown documentation for all packages and update README.md.
 
+Package metadata and the rendered ``<details>`` block of each package are
+cached on disk (see ``updater.cache``), keyed by a hash of the package's
+directory plus a shared key made of the locked ``narHash`` of every flake
+input, the shared Nix sources (flake.nix, lib/, overlays/) and the doc
+generator itself. Only packages whose key changed are evaluated and
+rendered again; with a warm cache a typical edit re-evaluates one package.
+"""
+
+import hashlib
 import json
+import os
 import subprocess
 import sys
 from pathlib import Path
 
+from updater.cache import atomic_write_bytes, cache_dir, cache_enabled
+
 # Markers for the generated section in README.md
 BEGIN_MARKER = "<!-- BEGIN GENERATED PACKAGE DOCS -->"
 END_MARKER = "<!-- END GENERATED PACKAGE DOCS -->"
 
+REPO_ROOT = Path(__file__).resolve().parent.parent
+NIX_FILE = Path(__file__).resolve().parent / "generate-package-docs.nix"
+
+# Sources outside packages/<name>/ that every package's metadata depends on.
+SHARED_SOURCES = ("flake.nix", "lib", "overlays")
+
+Metadata = dict[str, str | bool | None]
+
+
+def hash_tree(path: Path) -> str:
+    """Hash the relative paths and contents of every file under ``path``."""
+    digest = hashlib.sha256()
+    files = sorted(path.rglob("*")) if path.is_dir() else [path]
+    for file in files:
+        if file.is_file():
+            digest.update(str(file.relative_to(path.parent)).encode() + b"\0")
+            digest.update(file.read_bytes() + b"\0")
+    return digest.hexdigest()
+
+
+def shared_key() -> str:
+    """Return the part of every cache key that is shared by all packages."""
+    lock = json.loads((REPO_ROOT / "flake.lock").read_text())
+    nar_hashes = {
+        name: node.get("locked", {}).get("narHash")
+        for name, node in lock.get("nodes", {}).items()
+    }
+    digest = hashlib.sha256(json.dumps(nar_hashes, sort_keys=True).encode())
+    for source in (*(REPO_ROOT / s for s in SHARED_SOURCES), NIX_FILE, Path(__file__)):
+        digest.update(hash_tree(source).encode())
+    return digest.hexdigest()
+
+
+def package_keys() -> dict[str, str]:
+    """Return the cache key of every package directory."""
+    shared = shared_key()
+    return {
+        path.name: hashlib.sha256(f"{shared} {hash_tree(path)}".encode()).hexdigest()
+        for path in sorted((REPO_ROOT / "packages").iterdir())
+        if path.is_dir()
+    }
 
-def get_all_packages_metadata() -> dict[str, dict[str, str | bool | None]]:
-    """Get metadata for all packages using a single nix eval."""
-    nix_file = Path(__file__).parent / "generate-package-docs.nix"
+
+def get_all_packages_metadata(
+    names: list[str] | None = None,
+) -> dict[str, Metadata | None]:
+    """Get metadata for all packages (or only ``names``) using a single nix eval.
+
+    Packages that are hidden from the docs or failed to evaluate map to None.
+    """
+    env = dict(os.environ)
+    if names is not None:
+        env["PACKAGE_DOCS_NAMES"] = json.dumps(names)
 
     try:
         result = subprocess.run(
@@ -22,11 +83,12 @@ def get_all_packages_metadata() -> dict[str, dict[str, str | bool | None]]:
                 "eval",
                 "--json",
                 "--file",
-                str(nix_file),
+                str(NIX_FILE),
             ],
             capture_output=True,
             text=True,
             check=True,
+            env=env,
         )
     except subprocess.CalledProcessError as e:
         print(f"Error running nix eval: {e}", file=sys.stderr)
@@ -34,12 +96,11 @@ def get_all_packages_metadata() -> dict[str, dict[str, str | bool | None]]:
             print(f"stderr: {e.stderr}", file=sys.stderr)
         raise
 
-    data = json.loads(result.stdout)
-    # Filter out null values (packages that failed to evaluate)
-    return {k: v for k, v in data.items() if v is not None}
+    data: dict[str, Metadata | None] = json.loads(result.stdout)
+    return data
 
 
-def generate_package_doc(package: str, metadata: dict[str, str | bool | None]) -> str:
+def generate_package_doc(package: str, metadata: Metadata) -> str:
     """Generate markdown documentation for a package."""
     lines = []
     description = metadata.get("description", "No description available")
@@ -88,18 +149,69 @@ CATEGORY_ORDER = [
 ]
 
 
+def docs_cache_path() -> Path:
+    """Return the file holding cached per-package metadata and docs."""
+    return cache_dir("package-docs") / "packages.json"
+
+
+def get_package_docs() -> dict[str, tuple[Metadata, str]]:
+    """Return the metadata and rendered block of every documented package.
+
+    Cached entries whose key is unchanged are reused; the remaining
+    packages are evaluated in one nix eval and rendered.
+    """
+    if not cache_enabled():
+        return {
+            name: (metadata, generate_package_doc(name, metadata))
+            for name, metadata in get_all_packages_metadata().items()
+            if metadata is not None
+        }
+
+    keys = package_keys()
+    cache_path = docs_cache_path()
+    try:
+        cache = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        cache = {}
+
+    entries = {
+        name: cache[name]
+        for name, key in keys.items()
+        if name in cache and cache[name].get("key") == key
+    }
+    stale = [name for name in keys if name not in entries]
+    if stale:
+        print(f"Evaluating {len(stale)} of {len(keys)} package(s)...")
+        # Without any cache, evaluate the package set as a whole.
+        evaluated = get_all_packages_metadata(stale if entries else None)
+        for name in stale:
+            metadata = evaluated.get(name)
+            entries[name] = {
+                "key": keys[name],
+                "metadata": metadata,
+                "doc": generate_package_doc(name, metadata) if metadata else None,
+            }
+        atomic_write_bytes(cache_path, json.dumps(entries, sort_keys=True).encode())
+
+    return {
+        name: (entry["metadata"], entry["doc"])
+        for name, entry in entries.items()
+        if entry["metadata"] is not None
+    }
+
+
 def generate_all_docs() -> str:
     """Generate documentation for all packages, grouped by category."""
-    all_metadata = get_all_packages_metadata()
+    package_docs = get_package_docs()
 
     # Group packages by category
-    by_category: dict[str, list[tuple[str, dict]]] = {}
-    for package in sorted(all_metadata.keys()):
-        metadata = all_metadata[package]
-        category = metadata.get("category", "Uncategorized")
+    by_category: dict[str, list[tuple[str, str]]] = {}
+    for package in sorted(package_docs.keys()):
+        metadata, doc = package_docs[package]
+        category = str(metadata.get("category", "Uncategorized"))
         if category not in by_category:
             by_category[category] = []
-        by_category[category].append((package, metadata))
+        by_category[category].append((package, doc))
 
     docs = []
 
@@ -109,16 +221,14 @@ def generate_all_docs() -> str:
         if category in by_category:
             seen_categories.add(category)
             docs.append(f"### {category}\n")
-            for package, metadata in by_category[category]:
-                docs.append(generate_package_doc(package, metadata))
+            docs.extend(doc for _, doc in by_category[category])
             docs.append("")  # Add spacing between categories
 
     # Handle any categories not in CATEGORY_ORDER
     for category in sorted(by_category.keys()):
         if category not in seen_categories:
             docs.append(f"### {category}\n")
-            for package, metadata in by_category[category]:
-                docs.append(generate_package_doc(package, metadata))
+            docs.extend(doc for _, doc in by_category[category])
             docs.append("")
 
     return "\n".join(docs).rstrip()
@@ -8,7 +8,7 @@ including version fetching, hash calculation, and file modification.
 from .bun import clone_and_generate_bun_nix, regenerate_bun_nix
 
 # Dependency hash calculation
-from .deps import calculate_dependency_hash
+from .deps import calculate_dependency_hash, calculate_dependency_hashes
 
 # Hash utilities
 from .hash import calculate_url_hash
@@ -34,7 +34,9 @@ from .platforms import calculate_platform_hashes
 
 # Version fetching
 from .version import (
+    batched_release_lookups,
     fetch_github_latest_release,
+    fetch_github_latest_releases,
     fetch_npm_version,
     fetch_version_from_text,
     should_update,
@@ -42,12 +44,15 @@ from .version import (
 
 __all__ = [
     "NixCommandError",
+    "batched_release_lookups",
     "calculate_dependency_hash",
+    "calculate_dependency_hashes",
     "calculate_platform_hashes",
     "calculate_url_hash",
     "clone_and_generate_bun_nix",
     "extract_or_generate_lockfile",
     "fetch_github_latest_release",
+    "fetch_github_latest_releases",
     "fetch_json",
     "fetch_npm_version",
     "fetch_text",
@@ -0,0 +1,270 @@
+"""asyncio variants of the updater's HTTP and subprocess primitives.
+
+The blocking helpers in :mod:`updater.http`, :mod:`updater.nix` and
+:mod:`updater.hash` stay the API of the ``update.py`` scripts. This module
+offers coroutine versions of them so a caller can fan out hundreds of
+fetches and prefetches under one event loop instead of a thread pool per
+call::
+
+    hashes = run_sync(calculate_url_hashes(urls, limit=16))
+
+Nix commands run as asyncio subprocesses, at most ``NIX_CONCURRENCY`` per
+event loop. The standard library has no asynchronous HTTP client, so HTTP
+requests are handed to the shared keep-alive session (with its response
+cache and GitHub rate limiting) on the loop's executor; this keeps one
+connection pool and one quota tracker for sync and async callers alike.
+URL hashing reuses the steps of :func:`updater.hash.calculate_url_hash`
+(artifact index, download cache, in-process hashing) on the executor and
+runs only its Nix prefetches as subprocesses here.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import subprocess
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, cast
+
+from . import http
+from .hash import (
+    flat_url_hash,
+    known_url_hash,
+    native_unpacked_hash,
+    nix_base32_to_sri,
+    remember_url_hash,
+)
+from .nix import NixCommandError
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Coroutine, Iterable
+    from pathlib import Path
+
+# Nix subprocesses allowed to run at once per event loop.
+NIX_CONCURRENCY = 4
+
+_nix_semaphores: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, asyncio.Semaphore
+] = weakref.WeakKeyDictionary()
+
+
+def _nix_semaphore() -> asyncio.Semaphore:
+    """Return the subprocess semaphore of the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _nix_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _nix_semaphores[loop] = asyncio.Semaphore(NIX_CONCURRENCY)
+    return semaphore
+
+
+def run_sync[T](coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine to completion from synchronous code.
+
+    Works both from plain scripts and from code that is itself called
+    inside a running event loop (the coroutine then gets its own loop on a
+    helper thread).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+async def gather_bounded[T](aws: Iterable[Awaitable[T]], limit: int) -> list[T]:
+    """Await ``aws`` concurrently, at most ``limit`` at a time.
+
+    Returns:
+        Results in the order of ``aws``
+
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(bounded(aw) for aw in aws))
+
+
+async def fetch_text(
+    url: str,
+    *,
+    timeout: int = 30,  # noqa: ASYNC109 - socket timeout of the request itself
+    cache: bool = True,
+) -> str:
+    """Fetch text content from a URL; see :func:`updater.http.fetch_text`."""
+    return await asyncio.to_thread(http.fetch_text, url, timeout=timeout, cache=cache)
+
+
+async def fetch_json(
+    url: str,
+    *,
+    timeout: int = 30,  # noqa: ASYNC109 - socket timeout of the request itself
+    cache: bool = True,
+) -> dict[str, Any] | list[Any]:
+    """Fetch and parse JSON from a URL; see :func:`updater.http.fetch_json`."""
+    text = await fetch_text(url, timeout=timeout, cache=cache)
+    result: dict[str, Any] | list[Any] = json.loads(text)
+    return result
+
+
+async def run_command(
+    cmd: list[str],
+    *,
+    check: bool = True,
+    cwd: Path | None = None,
+) -> subprocess.CompletedProcess[str]:
+    """Run a command as an asyncio subprocess and capture its output.
+
+    Args:
+        cmd: Command and arguments to run
+        check: Whether to raise exception on non-zero exit
+        cwd: Working directory for the command
+
+    Returns:
+        CompletedProcess with command results
+
+    Raises:
+        NixCommandError: If command fails and check=True
+
+    """
+    async with _nix_semaphore():
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+        )
+        try:
+            stdout, stderr = await proc.communicate()
+        except asyncio.CancelledError:
+            with contextlib.suppress(ProcessLookupError):
+                proc.kill()
+            await proc.wait()
+            raise
+
+    returncode = cast("int", proc.returncode)
+    result = subprocess.CompletedProcess(
+        cmd,
+        returncode,
+        stdout.decode(errors="replace"),
+        stderr.decode(errors="replace"),
+    )
+    if check and returncode != 0:
+        msg = (
+            f"Command failed: {' '.join(cmd)}\n"
+            f"Exit code: {returncode}\n"
+            f"Stdout: {result.stdout}\n"
+            f"Stderr: {result.stderr}"
+        )
+        raise NixCommandError(msg)
+    return result
+
+
+async def nix_command(
+    args: list[str],
+    *,
+    check: bool = True,
+    cwd: Path | None = None,
+) -> subprocess.CompletedProcess[str]:
+    """Run a nix command with experimental features enabled.
+
+    See :func:`updater.nix.nix_command`.
+    """
+    cmd = ["nix", "--experimental-features", "nix-command flakes", *args]
+    return await run_command(cmd, check=check, cwd=cwd)
+
+
+async def nix_store_prefetch_file(url: str, hash_type: str = "sha256") -> str:
+    """Prefetch a file using nix store and return its hash in SRI format."""
+    args = ["store", "prefetch-file", "--hash-type", hash_type, "--json", url]
+    result = await nix_command(args)
+    data = json.loads(result.stdout)
+    return cast("str", data["hash"])
+
+
+async def nix_prefetch_url(url: str, *, unpack: bool = False) -> str:
+    """Prefetch a URL using nix-prefetch-url and return its SRI hash."""
+    args = ["nix-prefetch-url", "--type", "sha256"]
+    if unpack:
+        args.append("--unpack")
+    args.append(url)
+    result = await run_command(args)
+    return nix_base32_to_sri(result.stdout.strip())
+
+
+async def calculate_url_hash(
+    url: str,
+    *,
+    unpack: bool = False,
+    add_to_store: bool = False,
+    immutable: bool = False,
+) -> str:
+    """Calculate the hash of a URL; see :func:`updater.hash.calculate_url_hash`.
+
+    Downloading and hashing happen off the event loop; ``add_to_store``
+    prefetches and the ``nix-prefetch-url`` fallback for unsupported
+    archives run as asyncio subprocesses, at most ``NIX_CONCURRENCY`` at a
+    time.
+    """
+    known = await asyncio.to_thread(
+        known_url_hash,
+        url,
+        unpack=unpack,
+        add_to_store=add_to_store,
+        immutable=immutable,
+    )
+    if known is not None:
+        return known
+    if unpack:
+        download, sri = await asyncio.to_thread(
+            native_unpacked_hash, url, immutable=immutable
+        )
+        if sri is None:
+            sri = await nix_prefetch_url(download.file_url, unpack=True)
+    elif add_to_store:
+        sri = await nix_store_prefetch_file(url)
+    else:
+        sri = await asyncio.to_thread(flat_url_hash, url, immutable=immutable)
+    await asyncio.to_thread(
+        remember_url_hash, url, sri, unpack=unpack, immutable=immutable
+    )
+    return sri
+
+
+async def calculate_url_hashes(
+    urls: Iterable[str],
+    *,
+    unpack: bool = False,
+    add_to_store: bool = False,
+    immutable: bool = False,
+    limit: int = 16,
+) -> dict[str, str]:
+    """Calculate the hashes of many URLs concurrently.
+
+    Args:
+        urls: URLs to hash
+        unpack: Whether to unpack the archives (fetchzip hashes)
+        add_to_store: Whether to add flat downloads to the Nix store
+        immutable: Whether the URLs' content never changes
+        limit: Maximum number of URLs hashed at once
+
+    Returns:
+        Mapping of URL to hash in SRI format
+
+    """
+    unique = list(dict.fromkeys(urls))
+    hashes = await gather_bounded(
+        (
+            calculate_url_hash(
+                url, unpack=unpack, add_to_store=add_to_store, immutable=immutable
+            )
+            for url in unique
+        ),
+        limit,
+    )
+    return dict(zip(unique, hashes, strict=True))
@@ -0,0 +1,229 @@
+"""Repository-wide index of artifact hashes, shared across packages.
+
+Several packages pin the same upstream artifacts, most notably the
+``denoland/rusty_v8`` static libraries used by codex, codex-acp and
+goose-cli (four ~100 MB archives per v8 version). The :class:`ArtifactIndex`
+maps an artifact URL to its hash so that a v8 bump is downloaded once for
+the whole flake rather than once per package.
+
+The index is seeded from the pins already recorded in the tree: every
+``packages/*/hashes.json`` entry listed in :data:`PIN_URL_TEMPLATES` (and
+standalone pin files such as ``librusty_v8_hashes.json``) is expanded back
+into its URLs. Those are versioned release assets whose content never
+changes, so their hashes are always served.
+
+Hashes computed at runtime are only recorded, and only served again, for
+URLs the caller marks as immutable. A URL without a version in it (e.g. a
+"latest" binary) can be replaced upstream, and a remembered hash would then
+be wrong. Recorded entries live in an on-disk index in the updater cache
+directory, together with the artifact size when known and the time they
+were recorded. ``UPDATER_NO_CACHE=1`` disables the index.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from .cache import atomic_write_bytes, cache_dir, cache_enabled
+from .download import get_download_cache
+
+RUSTY_V8_URL_TEMPLATE = (
+    "https://github.com/denoland/rusty_v8/releases/download/"
+    "v{version}/librusty_v8_release_{platform}.a.gz"
+)
+
+RUSTY_V8_PLATFORMS = {
+    "x86_64-linux": "x86_64-unknown-linux-gnu",
+    "aarch64-linux": "aarch64-unknown-linux-gnu",
+    "x86_64-darwin": "x86_64-apple-darwin",
+    "aarch64-darwin": "aarch64-apple-darwin",
+}
+
+# Pins stored in hashes.json as {"version": ..., "hashes": {platform: hash}}
+# whose URLs can be rebuilt from a template: pin key -> (URL template,
+# nix platform -> URL platform).
+PIN_URL_TEMPLATES = {
+    "librusty_v8": (RUSTY_V8_URL_TEMPLATE, RUSTY_V8_PLATFORMS),
+}
+
+# Pin files that hold a single pin at the top level, by pin key.
+PIN_FILES = {
+    "librusty_v8_hashes.json": "librusty_v8",
+}
+
+# Seconds after which a runtime-recorded entry is no longer trusted.
+ARTIFACT_INDEX_MAX_AGE = 90 * 24 * 60 * 60
+
+PACKAGES_DIR = Path(__file__).resolve().parents[2] / "packages"
+
+
+@dataclass(frozen=True, slots=True)
+class ArtifactHash:
+    """Known hash of an artifact URL.
+
+    Attributes:
+        hash: SRI hash of the artifact
+        size: Artifact size in bytes, if known
+        timestamp: When the hash was recorded (seconds since the epoch)
+
+    """
+
+    hash: str
+    size: int | None = None
+    timestamp: float = 0.0
+
+
+def _index_key(url: str, *, unpack: bool) -> str:
+    # Flat (fetchurl) and unpacked (fetchzip) hashes of a URL differ.
+    return f"{'unpack' if unpack else 'flat'} {url}"
+
+
+def _pin_urls(pin: object, template: str, platforms: dict[str, str]) -> dict[str, str]:
+    """Expand a {"version", "hashes"} pin into a URL -> hash mapping."""
+    if not isinstance(pin, dict):
+        return {}
+    version, hashes = pin.get("version"), pin.get("hashes")
+    if not isinstance(version, str) or not isinstance(hashes, dict):
+        return {}
+    return {
+        template.format(version=version, platform=platforms[nix_platform]): sri
+        for nix_platform, sri in hashes.items()
+        if nix_platform in platforms and isinstance(sri, str)
+    }
+
+
+def seed_from_packages(packages_dir: Path = PACKAGES_DIR) -> dict[str, str]:
+    """Collect flat artifact hashes from the pins recorded in the tree.
+
+    Returns:
+        Mapping of artifact URL to SRI hash
+
+    """
+    seeds: dict[str, str] = {}
+    for path in sorted(packages_dir.glob("*/*.json")):
+        if path.name != "hashes.json" and path.name not in PIN_FILES:
+            continue
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if path.name in PIN_FILES:
+            pins = {PIN_FILES[path.name]: data}
+        else:
+            pins = data if isinstance(data, dict) else {}
+        for key, (template, platforms) in PIN_URL_TEMPLATES.items():
+            seeds.update(_pin_urls(pins.get(key), template, platforms))
+    return seeds
+
+
+class ArtifactIndex:
+    """URL -> hash index seeded from the tree and extended at runtime."""
+
+    def __init__(self, path: Path | None, seeds: dict[str, str]) -> None:
+        """Load the index stored at ``path`` (if any) on top of ``seeds``."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, ArtifactHash] = {
+            _index_key(url, unpack=False): ArtifactHash(sri)
+            for url, sri in seeds.items()
+        }
+        self._recorded: dict[str, ArtifactHash] = self._load()
+
+    @classmethod
+    def from_env(cls) -> ArtifactIndex | None:
+        """Return the default index, or None if caching is disabled."""
+        if not cache_enabled():
+            return None
+        return cls(cache_dir("artifacts") / "index.json", seed_from_packages())
+
+    def _load(self) -> dict[str, ArtifactHash]:
+        if self.path is None:
+            return {}
+        try:
+            raw = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        cutoff = time.time() - ARTIFACT_INDEX_MAX_AGE
+        entries: dict[str, ArtifactHash] = {}
+        for key, value in raw.items():
+            try:
+                entry = ArtifactHash(**value)
+            except TypeError:
+                continue
+            if entry.timestamp >= cutoff:
+                entries[key] = entry
+        return entries
+
+    def lookup(
+        self, url: str, *, unpack: bool = False, immutable: bool = False
+    ) -> ArtifactHash | None:
+        """Return the known hash of ``url``, if any.
+
+        Seeded pins are always returned; hashes recorded at runtime only
+        when the caller declares ``url`` immutable.
+        """
+        key = _index_key(url, unpack=unpack)
+        with self._lock:
+            seeded = self._entries.get(key)
+            if seeded is not None or not immutable:
+                return seeded
+            return self._recorded.get(key)
+
+    def record(
+        self, url: str, sri: str, *, unpack: bool = False, size: int | None = None
+    ) -> None:
+        """Remember the hash of an immutable ``url`` for later lookups and runs."""
+        key = _index_key(url, unpack=unpack)
+        entry = ArtifactHash(sri, size, time.time())
+        with self._lock:
+            self._recorded[key] = entry
+            if self.path is None:
+                return
+            # Merge with entries other processes recorded since we loaded.
+            merged = {**self._load(), key: entry}
+            self._recorded.update(merged)
+            data = {k: asdict(v) for k, v in sorted(merged.items())}
+            atomic_write_bytes(self.path, json.dumps(data, indent=1).encode())
+
+
+_index: ArtifactIndex | None = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def get_artifact_index() -> ArtifactIndex | None:
+    """Return the process-wide artifact index, or None if disabled."""
+    global _index, _index_loaded  # noqa: PLW0603
+    with _index_lock:
+        if not _index_loaded:
+            _index = ArtifactIndex.from_env()
+            _index_loaded = True
+        return _index
+
+
+def lookup_artifact_hash(
+    url: str, *, unpack: bool = False, immutable: bool = False
+) -> str | None:
+    """Return the indexed hash of ``url``, or None if unknown or disabled.
+
+    See :meth:`ArtifactIndex.lookup` for when recorded hashes are used.
+    """
+    index = get_artifact_index()
+    if index is None:
+        return None
+    entry = index.lookup(url, unpack=unpack, immutable=immutable)
+    return entry.hash if entry is not None else None
+
+
+def record_artifact_hash(url: str, sri: str, *, unpack: bool = False) -> None:
+    """Add the computed hash of an immutable ``url`` to the index, if enabled."""
+    index = get_artifact_index()
+    if index is None:
+        return
+    # The download cache knows the size of archives it has stored.
+    download = get_download_cache().lookup(url, immutable=True)
+    index.record(url, sri, unpack=unpack, size=download.size if download else None)
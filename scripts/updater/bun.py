@@ -2,16 +2,135 @@
 
 Provides helpers for regenerating bun.nix lockfiles using bun2nix,
 used by packages that depend on the bun2nix flake input.
+
+The inputs of each generated bun.nix are recorded in a digest file next to
+it (``bun-lock-digest.json`` for ``bun.nix``): the upstream lockfile and
+manifests, the lockfile bun2nix consumed, the stale-lock patch and the
+locked bun2nix revision. When a version bump leaves all of them unchanged,
+``bun install``, bun2nix and ``nix fmt`` are skipped.
 """
 
 from __future__ import annotations
 
+import hashlib
+import json
 import subprocess
 import tempfile
 from pathlib import Path
 
+from .hash import hex_to_sri
+from .hashes_file import load_hashes, save_hashes
 from .nix import run_command
 
+# Files ``bun install --lockfile-only`` needs to resolve a workspace: the
+# lockfile, every package.json (workspace members included), bun/npm config
+# and patchedDependencies. Non-cone sparse-checkout (gitignore) syntax.
+BUN_SPARSE_PATTERNS = (
+    "/bun.lock",
+    "/bun.lockb",
+    "/bunfig.toml",
+    "/.npmrc",
+    "package.json",
+    "*.patch",
+)
+
+
+def sparse_clone(url: str, ref: str, dest: Path, patterns: tuple[str, ...]) -> None:
+    """Shallow, blobless clone of ``url`` at ``ref`` with a sparse checkout.
+
+    Only the blobs of files matching ``patterns`` are downloaded, so for
+    large monorepos the transfer is the commit's trees plus a few small
+    manifests instead of the whole source tree. Servers without partial
+    clone support fall back to a regular shallow clone.
+
+    Args:
+        url: Git repository URL
+        ref: Branch or tag to check out
+        dest: Directory to clone into
+        patterns: Non-cone sparse-checkout patterns of the files to check out
+
+    """
+    subprocess.run(
+        [
+            "git",
+            "clone",
+            "--depth=1",
+            "--filter=blob:none",
+            "--no-checkout",
+            f"--branch={ref}",
+            url,
+            str(dest),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(
+        ["git", "sparse-checkout", "set", "--no-cone", *patterns],
+        cwd=dest,
+        check=True,
+        capture_output=True,
+    )
+    # Populates the work tree, fetching just the blobs that match.
+    subprocess.run(["git", "checkout"], cwd=dest, check=True, capture_output=True)
+
+
+def _digest(*parts: bytes) -> str:
+    """Return the SRI sha256 of ``parts``, length-prefixed so they can't run together."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return hex_to_sri(digest.hexdigest())
+
+
+def _bun2nix_rev(flake_root: Path) -> bytes:
+    """Return the locked bun2nix revision, which also determines bun.nix."""
+    try:
+        lock = json.loads((flake_root / "flake.lock").read_text())
+        return str(lock["nodes"]["bun2nix"]["locked"]["rev"]).encode()
+    except (OSError, ValueError, KeyError):
+        return b""
+
+
+def bun_digest_path(bun_nix_output: Path) -> Path:
+    """Return the digest file recorded next to ``bun_nix_output``."""
+    return bun_nix_output.with_name(f"{bun_nix_output.stem}-lock-digest.json")
+
+
+def _load_digests(bun_nix_output: Path) -> dict[str, str]:
+    """Load the recorded digests, or nothing if bun.nix or the file is missing."""
+    if not bun_nix_output.exists():
+        return {}
+    try:
+        return {
+            k: str(v) for k, v in load_hashes(bun_digest_path(bun_nix_output)).items()
+        }
+    except (OSError, ValueError):
+        return {}
+
+
+def _record_digests(bun_nix_output: Path, **digests: str) -> None:
+    """Merge ``digests`` into the digest file next to ``bun_nix_output``."""
+    path = bun_digest_path(bun_nix_output)
+    save_hashes(path, {**_load_digests(bun_nix_output), **digests})
+
+
+def _source_digest(repo_dir: Path, flake_root: Path) -> str:
+    """Digest every checked-out lockfile and manifest of a sparse clone."""
+    parts = [_bun2nix_rev(flake_root)]
+    for path in sorted(repo_dir.rglob("*")):
+        relative = path.relative_to(repo_dir)
+        if relative.parts[0] != ".git" and path.is_file():
+            parts += [str(relative).encode(), path.read_bytes()]
+    return _digest(*parts)
+
+
+def _patch_digest(patch_file: Path | None) -> str:
+    """Digest the stale-lock patch (empty when absent)."""
+    if patch_file is None or not patch_file.exists():
+        return _digest(b"")
+    return _digest(patch_file.read_bytes())
+
 
 def regenerate_bun_nix(
     bun_lock_path: Path,
@@ -22,7 +141,8 @@ def regenerate_bun_nix(
 
     Runs bun2nix directly from the flake's bun2nix input via
     ``nix run --inputs-from``, which handles building and caching
-    the binary automatically.
+    the binary automatically. Skipped when ``bun_lock_path`` and the
+    bun2nix revision match the digest recorded for ``bun_nix_output``.
 
     Args:
         bun_lock_path: Path to the bun.lock file
@@ -33,6 +153,14 @@ def regenerate_bun_nix(
         RuntimeError: If bun2nix fails
 
     """
+    lock_digest = _digest(bun_lock_path.read_bytes(), _bun2nix_rev(flake_root))
+    if _load_digests(bun_nix_output).get("bunLock") == lock_digest:
+        print(
+            f"bun.lock unchanged ({lock_digest}), "
+            f"skipped bun2nix and nix fmt for {bun_nix_output.name}"
+        )
+        return
+
     try:
         run_command(
             [
@@ -60,6 +188,7 @@ def regenerate_bun_nix(
     except Exception as e:
         msg = f"bun2nix failed: {e}"
         raise RuntimeError(msg) from e
+    _record_digests(bun_nix_output, bunLock=lock_digest)
 
 
 def clone_and_generate_bun_nix(
@@ -76,6 +205,10 @@ def clone_and_generate_bun_nix(
 
     This is the high-level helper most update.py scripts should use.
     It handles cloning the repo, locating the bun.lock, and running bun2nix.
+    Only the lockfile and manifests are checked out (see
+    :data:`BUN_SPARSE_PATTERNS`), not the source tree. If they, the
+    stale-lock patch and bun2nix are unchanged since bun.nix was last
+    generated, nothing else is run.
 
     Always runs ``bun install`` to ensure bun.lock is consistent with
     package.json (upstream lockfiles are sometimes stale).
@@ -102,20 +235,26 @@ def clone_and_generate_bun_nix(
     with tempfile.TemporaryDirectory() as tmpdir:
         repo_dir = Path(tmpdir) / repo
 
-        print(f"Cloning {owner}/{repo} at {ref}...")
-        subprocess.run(
-            [
-                "git",
-                "clone",
-                "--depth=1",
-                f"--branch={ref}",
-                f"https://github.com/{owner}/{repo}.git",
-                str(repo_dir),
-            ],
-            check=True,
-            capture_output=True,
+        print(f"Cloning {owner}/{repo} at {ref} (manifests only)...")
+        sparse_clone(
+            f"https://github.com/{owner}/{repo}.git",
+            ref,
+            repo_dir,
+            BUN_SPARSE_PATTERNS,
         )
 
+        patch_file = pkg_dir / "fix-stale-bun-lock.patch" if pkg_dir else None
+        source_digest = _source_digest(repo_dir, flake_root)
+        recorded = _load_digests(bun_nix_output)
+        if recorded.get("source") == source_digest and recorded.get(
+            "patch"
+        ) == _patch_digest(patch_file):
+            print(
+                f"Upstream bun.lock and manifests unchanged ({source_digest}), "
+                f"skipped bun install, bun2nix and nix fmt"
+            )
+            return
+
         bun_lock = repo_dir / "bun.lock"
         lockfile_was_stale = False
 
@@ -158,8 +297,6 @@ def clone_and_generate_bun_nix(
 
         regenerate_bun_nix(bun_lock, bun_nix_output, flake_root)
 
-        patch_file = pkg_dir / "fix-stale-bun-lock.patch" if pkg_dir else None
-
         if lockfile_was_stale:
             if patch_file is not None:
                 # Generate the diff and save it so the Nix build can apply it.
@@ -189,3 +326,7 @@ def clone_and_generate_bun_nix(
         elif patch_file is not None:
             # Upstream lockfile is now fresh — clear the patch so it's a no-op.
             patch_file.write_text("")
+
+        _record_digests(
+            bun_nix_output, source=source_digest, patch=_patch_digest(patch_file)
+        )
@@ -0,0 +1,110 @@
+"""On-disk cache locations and eviction shared by the updater caches.
+
+Caches live under ``$UPDATER_CACHE_DIR`` (default
+``$XDG_CACHE_HOME/llm-agents-nix``). Setting ``UPDATER_NO_CACHE=1``
+bypasses every persistent cache, which is useful when debugging an
+updater against live upstream data.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Collection
+
+
+def cache_enabled() -> bool:
+    """Return False when persistent caches are disabled via the environment."""
+    return os.environ.get("UPDATER_NO_CACHE", "") in {"", "0"}
+
+
+def cache_dir(name: str) -> Path:
+    """Return (and create) the cache directory for ``name``."""
+    root = os.environ.get("UPDATER_CACHE_DIR")
+    if root:
+        base = Path(root)
+    else:
+        xdg = os.environ.get("XDG_CACHE_HOME")
+        base = (Path(xdg) if xdg else Path.home() / ".cache") / "llm-agents-nix"
+    path = base / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write ``data`` to ``path`` so concurrent readers never see partial files."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        Path(tmp).replace(path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def touch(path: Path) -> None:
+    """Mark ``path`` as recently used for LRU eviction."""
+    with contextlib.suppress(OSError):
+        os.utime(path)
+
+
+def evict_lru(
+    directory: Path,
+    *,
+    max_bytes: int | None = None,
+    max_entries: int | None = None,
+    max_age: float | None = None,
+    keep: Collection[Path] = (),
+) -> list[Path]:
+    """Delete least recently used files until the directory fits its budget.
+
+    Recency is tracked through the modification time, which :func:`touch`
+    bumps on every cache hit. Hidden files (in-flight atomic writes) are
+    never counted or removed, and files in ``keep`` (still in use) are
+    counted but never removed.
+
+    Args:
+        directory: Cache directory to prune
+        max_bytes: Maximum total size of the remaining files
+        max_entries: Maximum number of remaining files
+        max_age: Seconds since last use after which a file is removed
+        keep: Files that must not be removed
+
+    Returns:
+        Paths that were removed
+
+    """
+    entries: list[tuple[float, int, Path]] = []
+    for path in directory.iterdir():
+        if path.name.startswith("."):
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    count = len(entries)
+    removed: list[Path] = []
+    cutoff = time.time() - max_age if max_age is not None else None
+    for mtime, size, path in sorted(entries):
+        expired = cutoff is not None and mtime < cutoff
+        over_bytes = max_bytes is not None and total > max_bytes
+        over_entries = max_entries is not None and count > max_entries
+        if not (expired or over_bytes or over_entries):
+            break
+        if path in keep:
+            continue
+        path.unlink(missing_ok=True)
+        removed.append(path)
+        total -= size
+        count -= 1
+    return removed
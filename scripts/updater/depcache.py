@@ -0,0 +1,239 @@
+"""Memo cache for dependency hashes keyed by lockfile content.
+
+A cargoHash, vendorHash or npmDepsHash only depends on the lockfile(s) its
+fetcher reads and on the fetcher's own version. When an updater is re-run
+after a transient failure, or upstream releases without touching its
+dependencies, the lockfile is byte-identical to one already hashed and the
+dummy-hash build can be skipped entirely.
+
+Entries are keyed by (hash key, fetcher kind, lockfile digest, fetcher
+version) and expire after ``DEPENDENCY_CACHE_MAX_AGE`` without use or once
+more than ``DEPENDENCY_CACHE_MAX_ENTRIES`` are stored. The fetcher version
+always includes the locked nixpkgs ``narHash`` (the fetchers come from
+nixpkgs) and, for npm and pnpm, the ``npmDepsFetcherVersion`` /
+``fetcherVersion`` declared by the package (see :func:`fetcher_version`), so
+a flake.lock bump never reuses a hash produced by older fetchers.
+
+Some dependency hashes depend on more than lockfiles: ``go mod vendor``
+(``buildGoModule`` without ``proxyVendor``) only vendors the packages the
+source actually imports, and runs with whatever Go toolchain the package
+overrides. Those hashes are keyed on the whole source with
+:func:`lock_from_source` instead, together with the toolchain's pin file.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import tarfile
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from .cache import atomic_write_bytes, cache_dir, cache_enabled, evict_lru, touch
+from .download import cached_download
+
+FLAKE_LOCK = Path(__file__).resolve().parents[2] / "flake.lock"
+
+# Seconds without use after which a memoized hash is dropped.
+DEPENDENCY_CACHE_MAX_AGE = 90 * 24 * 60 * 60
+
+# Upper bound on memoized hashes kept on disk.
+DEPENDENCY_CACHE_MAX_ENTRIES = 5_000
+
+# Package attributes that select a fetcher version, by hash key.
+FETCHER_VERSION_ATTRS = {
+    "npmDepsHash": "npmDepsFetcherVersion",
+    "pnpmDepsHash": "fetcherVersion",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class DependencyLock:
+    """Lockfile contents that fully determine a dependency hash.
+
+    Attributes:
+        content: Lockfile bytes (several files are concatenated by
+            :func:`lock_from_archive`)
+        fetcher_version: Version of the fetcher that produces the hash.
+            :func:`updater.deps.calculate_dependency_hash` always adds the
+            package's :func:`fetcher_version`; callers only need to set
+            this for inputs it cannot see
+
+    """
+
+    content: bytes
+    fetcher_version: str = ""
+
+    @property
+    def digest(self) -> str:
+        """Return the sha256 of the lockfile contents."""
+        return hashlib.sha256(self.content).hexdigest()
+
+
+def lock_from_archive(
+    url: str, *paths: str, fetcher_version: str = ""
+) -> DependencyLock:
+    """Read lockfiles out of a source tarball for use as a memo key.
+
+    The tarball is taken from the download cache, so calling this after
+    ``calculate_url_hash(url, unpack=True)`` does not download it again.
+
+    Args:
+        url: URL of the source tarball
+        *paths: Lockfile paths relative to the archive's top-level directory
+            (e.g. "Cargo.lock", "go.mod", "go.sum")
+        fetcher_version: Version of the fetcher that consumes the lockfiles
+
+    Returns:
+        The combined lockfile contents
+
+    Raises:
+        FileNotFoundError: If any of the paths is missing from the archive
+
+    """
+    wanted = set(paths)
+    found: dict[str, bytes] = {}
+    with tarfile.open(cached_download(url).path, "r:*") as tar:
+        for member in tar:
+            _, _, relative = member.name.partition("/")
+            if relative not in wanted or not member.isreg():
+                continue
+            f = tar.extractfile(member)
+            if f is not None:
+                found[relative] = f.read()
+
+    missing = wanted - found.keys()
+    if missing:
+        msg = f"{', '.join(sorted(missing))} not found in {url}"
+        raise FileNotFoundError(msg)
+    content = b"".join(path.encode() + b"\0" + found[path] + b"\0" for path in paths)
+    return DependencyLock(content, fetcher_version)
+
+
+def lock_from_source(source_hash: str, *inputs: Path) -> DependencyLock:
+    """Use a whole source tree, plus local inputs, as a memo key.
+
+    For fetchers whose output depends on the source itself and not only on
+    its lockfiles. Only a re-run for the same source (e.g. after a failed
+    build) can then reuse the hash.
+
+    Args:
+        source_hash: Hash of the unpacked source (the package's ``hash``)
+        *inputs: Further files the dependency hash depends on, such as the
+            ``hashes.json`` of a toolchain the package builds with
+
+    Returns:
+        The combined memo key contents
+
+    """
+    content = b"source\0" + source_hash.encode() + b"\0"
+    for path in inputs:
+        content += path.name.encode() + b"\0" + path.read_bytes() + b"\0"
+    return DependencyLock(content)
+
+
+def nixpkgs_nar_hash(flake_lock: Path = FLAKE_LOCK) -> str:
+    """Return the locked narHash of the flake's nixpkgs input ("" if unknown)."""
+    try:
+        lock = json.loads(flake_lock.read_text())
+        nodes = lock["nodes"]
+        node = nodes[lock["root"]]["inputs"]["nixpkgs"]
+        return str(nodes[node]["locked"]["narHash"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return ""
+
+
+def fetcher_version(hash_key: str, package_dir: Path) -> str:
+    """Describe the fetcher that produces ``hash_key`` for a package.
+
+    Combines the locked nixpkgs narHash with the fetcher version attribute
+    declared in the package's Nix files, where one applies.
+
+    Args:
+        hash_key: Dependency hash key (e.g., "npmDepsHash")
+        package_dir: Directory holding the package's Nix files
+
+    Returns:
+        Fetcher version string for :class:`DependencyLock`
+
+    """
+    parts = [f"nixpkgs={nixpkgs_nar_hash()}"]
+    attr = FETCHER_VERSION_ATTRS.get(hash_key)
+    if attr is not None:
+        pattern = re.compile(rf"\b{attr}\s*=\s*(\d+)\s*;")
+        versions = sorted(
+            {
+                match.group(1)
+                for nix_file in sorted(package_dir.glob("*.nix"))
+                for match in pattern.finditer(nix_file.read_text())
+            }
+        )
+        parts.append(f"{attr}={','.join(versions)}")
+    return ";".join(parts)
+
+
+def with_fetcher_version(
+    lock: DependencyLock, hash_key: str, package_dir: Path
+) -> DependencyLock:
+    """Return ``lock`` with the package's fetcher version added to its key."""
+    version = fetcher_version(hash_key, package_dir)
+    if lock.fetcher_version:
+        version = f"{lock.fetcher_version};{version}"
+    return replace(lock, fetcher_version=version)
+
+
+class DependencyHashCache:
+    """On-disk map from lockfile inputs to a dependency hash."""
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        max_age: float = DEPENDENCY_CACHE_MAX_AGE,
+        max_entries: int = DEPENDENCY_CACHE_MAX_ENTRIES,
+    ) -> None:
+        """Use ``directory`` for memoized hashes."""
+        self.directory = directory
+        self.max_age = max_age
+        self.max_entries = max_entries
+
+    @classmethod
+    def from_env(cls) -> DependencyHashCache | None:
+        """Return the default cache, or None if caching is disabled."""
+        if not cache_enabled():
+            return None
+        return cls(cache_dir("dependency-hashes"))
+
+    def _path(self, hash_key: str, fetcher: str, lock: DependencyLock) -> Path:
+        key = json.dumps([hash_key, fetcher, lock.digest, lock.fetcher_version])
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def get(self, hash_key: str, fetcher: str, lock: DependencyLock) -> str | None:
+        """Return the memoized hash for these inputs, unless missing or expired."""
+        path = self._path(hash_key, fetcher, lock)
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age:
+                return None
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        touch(path)
+        value: str = entry["hash"]
+        return value
+
+    def put(
+        self, hash_key: str, fetcher: str, lock: DependencyLock, value: str
+    ) -> None:
+        """Memoize ``value`` for these inputs and prune old entries."""
+        entry = {
+            "hashKey": hash_key,
+            "fetcher": fetcher,
+            "lockDigest": lock.digest,
+            "fetcherVersion": lock.fetcher_version,
+            "hash": value,
+        }
+        path = self._path(hash_key, fetcher, lock)
+        atomic_write_bytes(path, json.dumps(entry).encode())
+        evict_lru(self.directory, max_entries=self.max_entries, max_age=self.max_age)
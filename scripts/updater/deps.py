@@ -5,12 +5,37 @@ This module provides utilities for calculating dependency hashes
 dummy-hash-and-build pattern.
 """
 
+import re
+from collections.abc import Callable, Iterable
 from pathlib import Path
 from typing import Any
 
+from .depcache import DependencyHashCache, DependencyLock, with_fetcher_version
 from .hash import DUMMY_SHA256_HASH, extract_hash_from_build_error
 from .hashes_file import save_hashes
-from .nix import NixCommandError, nix_build
+from .nix import NixCommandError, nix_build_until
+
+# Fixed-output derivation that consumes each dependency hash. Building just
+# this attribute surfaces the hash mismatch without Nix scheduling any of
+# the package's own build work first.
+DEPENDENCY_HASH_ATTRS = {
+    "cargoHash": "cargoDeps",
+    "vendorHash": "goModules",
+    "npmDepsHash": "npmDeps",
+    "pnpmDepsHash": "pnpmDeps",
+}
+
+# Name suffixes of the fixed-output derivations behind each hash key, used to
+# attribute the mismatches reported by a multi-target build. fetchCargoVendor
+# reports its "-vendor-staging" derivation rather than cargoDeps itself.
+DEPENDENCY_DRV_SUFFIXES = {
+    "cargoHash": ("-vendor-staging", "-vendor", "-vendor.tar.gz"),
+    "vendorHash": ("-go-modules",),
+    "npmDepsHash": ("-npm-deps",),
+    "pnpmDepsHash": ("-pnpm-deps",),
+}
+
+_MISMATCH_DRV = re.compile(r"hash mismatch in fixed-output derivation '([^']+)'")
 
 
 def calculate_dependency_hash(
@@ -18,6 +43,9 @@ def calculate_dependency_hash(
     hash_key: str,
     hashes_file: Path,
     data: dict[str, Any],
+    *,
+    fod_only: bool = True,
+    lock: DependencyLock | None = None,
 ) -> str:
     """Calculate dependency hash by building with dummy hash and extracting from error.
 
@@ -25,14 +53,27 @@ def calculate_dependency_hash(
     1. Saves the current hash value
     2. Writes a dummy hash to hashes.json
     3. Triggers a nix build (which will fail)
-    4. Extracts the correct hash from the build error
+    4. Extracts the correct hash from the build output, aborting the build
+       as soon as it appears
     5. Restores original hash on failure
 
+    With ``fod_only`` (the default) and a known ``hash_key``, only the
+    fixed-output dependency attribute (e.g. ``.#codex.cargoDeps``) is built.
+    If that attribute does not exist or does not use the hash, the whole
+    package is built instead.
+
+    When ``lock`` is given, the result is memoized on disk by lockfile
+    content and fetcher version (see :mod:`updater.depcache`) and a
+    previously computed hash for identical inputs is returned without
+    building anything.
+
     Args:
         package_attr: Nix package attribute (e.g., ".#codex", ".#claude-code")
         hash_key: Key in data dict for the hash (e.g., "cargoHash", "vendorHash")
         hashes_file: Path to hashes.json file
         data: Dictionary containing package data
+        fod_only: Whether to try building only the dependency derivation first
+        lock: Lockfile contents the hash depends on, used as memo key
 
     Returns:
         Calculated hash in SRI format
@@ -42,22 +83,266 @@ def calculate_dependency_hash(
 
     """
     print(f"Calculating {hash_key}...")
+    cache = DependencyHashCache.from_env() if lock is not None else None
+    fetcher = _fetcher_kind(hash_key)
+    if lock is not None:
+        lock = with_fetcher_version(lock, hash_key, hashes_file.parent)
+    if cache is not None and lock is not None:
+        cached = cache.get(hash_key, fetcher, lock)
+        if cached is not None:
+            print(f"Lockfile unchanged, reusing cached {hash_key}: {cached}")
+            return cached
+
+    dep_hash = _build_dependency_hash(
+        package_attr, hash_key, hashes_file, data, fod_only=fod_only
+    )
+    if cache is not None and lock is not None:
+        cache.put(hash_key, fetcher, lock, dep_hash)
+    return dep_hash
+
+
+def _build_dependency_hash(
+    package_attr: str,
+    hash_key: str,
+    hashes_file: Path,
+    data: dict[str, Any],
+    *,
+    fod_only: bool,
+    other_keys: Iterable[str] = (),
+) -> str:
+    """Run the dummy-hash build for :func:`calculate_dependency_hash`.
+
+    ``other_keys`` name further hash keys of the same package whose
+    derivations the build may also reach; a mismatch reported for one of
+    their derivations is then not taken as ``hash_key``'s hash.
+    """
     original_hash = data[hash_key]
 
     # Write dummy hash
     data[hash_key] = DUMMY_SHA256_HASH
     save_hashes(hashes_file, data)
 
-    try:
-        nix_build(package_attr, check=True)
-        msg = "Build succeeded with dummy hash - unexpected"
-        raise ValueError(msg)
-    except NixCommandError as e:
-        dep_hash = extract_hash_from_build_error(e.args[0])
-        if not dep_hash:
-            # Restore original hash
-            data[hash_key] = original_hash
-            save_hashes(hashes_file, data)
-            msg = f"Could not extract hash from build error:\n{e.args[0]}"
-            raise ValueError(msg) from e
-        return dep_hash
+    attrs = [package_attr]
+    fod_attr = DEPENDENCY_HASH_ATTRS.get(hash_key) if fod_only else None
+    if fod_attr:
+        attrs.insert(0, f"{package_attr}.{fod_attr}")
+
+    other_keys = [key for key in other_keys if key != hash_key]
+    match = (
+        _key_matcher(hash_key, other_keys)
+        if other_keys
+        else extract_hash_from_build_error
+    )
+    error: NixCommandError | None = None
+    for attr in attrs:
+        try:
+            # Stops the build as soon as the mismatch line is printed.
+            dep_hash = nix_build_until(attr, match)
+        except NixCommandError as e:
+            # The matcher has seen every line; only the plain extractor can
+            # still find a hash split differently in the collected output.
+            dep_hash = None if other_keys else extract_hash_from_build_error(e.args[0])
+            if dep_hash:
+                return dep_hash
+            error = e
+        else:
+            if dep_hash:
+                return dep_hash
+            if attr == package_attr:
+                msg = "Build succeeded with dummy hash - unexpected"
+                raise ValueError(msg)
+        if attr != package_attr:
+            print(f"No hash mismatch from {attr}, building {package_attr}...")
+
+    # Restore original hash
+    data[hash_key] = original_hash
+    save_hashes(hashes_file, data)
+    msg = f"Could not extract hash from build error:\n{error.args[0] if error else ''}"
+    raise ValueError(msg) from error
+
+
+def _fetcher_kind(hash_key: str) -> str:
+    """Return the fetcher kind used in dependency-hash memo keys."""
+    return DEPENDENCY_HASH_ATTRS.get(hash_key, hash_key)
+
+
+def _lookup_cached_hashes(
+    cache: DependencyHashCache | None, locks: dict[str, DependencyLock]
+) -> dict[str, str]:
+    """Return memoized hashes for every key whose lockfile is unchanged."""
+    cached: dict[str, str] = {}
+    if cache is None:
+        return cached
+    for key, lock in locks.items():
+        hit = cache.get(key, _fetcher_kind(key), lock)
+        if hit is not None:
+            print(f"Lockfile unchanged, reusing cached {key}: {hit}")
+            cached[key] = hit
+    return cached
+
+
+def _fod_attrs(targets: dict[str, str], hash_keys: list[str]) -> list[str]:
+    """Return the distinct fixed-output attributes to build for ``hash_keys``."""
+    attrs: list[str] = []
+    for key in hash_keys:
+        attr = f"{targets[key]}.{DEPENDENCY_HASH_ATTRS[key]}"
+        if attr not in attrs:
+            attrs.append(attr)
+    return attrs
+
+
+def _drv_name(drv_path: str) -> str:
+    """Return the name part of a store path like /nix/store/<hash>-<name>.drv."""
+    base = drv_path.rsplit("/", 1)[-1].removesuffix(".drv")
+    return base.split("-", 1)[1] if "-" in base else base
+
+
+class _MismatchCollector:
+    """Collect ``got:`` hashes from build output and map them to hash keys.
+
+    A key without known derivation names takes any mismatch not claimed by
+    the derivation names of ``other_keys``.
+    """
+
+    def __init__(self, hash_keys: list[str], *, other_keys: Iterable[str] = ()) -> None:
+        self.hash_keys = hash_keys
+        self.found: dict[str, str] = {}
+        self._drv: str | None = None
+        self._claimed = tuple(
+            suffix
+            for key in other_keys
+            for suffix in DEPENDENCY_DRV_SUFFIXES.get(key, ())
+        )
+
+    def _key_for(self, drv_name: str) -> str | None:
+        if self._claimed and drv_name.endswith(self._claimed):
+            return None
+        for key in self.hash_keys:
+            if key in self.found:
+                continue
+            suffixes = DEPENDENCY_DRV_SUFFIXES.get(key)
+            if suffixes is None or drv_name.endswith(suffixes):
+                return key
+        return None
+
+    def __call__(self, line: str) -> str | None:
+        if match := _MISMATCH_DRV.search(line):
+            self._drv = _drv_name(match.group(1))
+            return None
+        got = extract_hash_from_build_error(line)
+        if got and self._drv is not None:
+            key = self._key_for(self._drv)
+            if key is not None:
+                self.found[key] = got
+            self._drv = None
+        # Stop the build once every key is accounted for.
+        return "done" if len(self.found) == len(self.hash_keys) else None
+
+
+def _key_matcher(
+    hash_key: str, other_keys: Iterable[str]
+) -> Callable[[str], str | None]:
+    """Return a build-output matcher yielding the ``got:`` hash of ``hash_key``."""
+    collector = _MismatchCollector([hash_key], other_keys=other_keys)
+
+    def match(line: str) -> str | None:
+        collector(line)
+        return collector.found.get(hash_key)
+
+    return match
+
+
+def calculate_dependency_hashes(
+    targets: dict[str, str],
+    hashes_file: Path,
+    data: dict[str, Any],
+    *,
+    locks: dict[str, DependencyLock] | None = None,
+) -> dict[str, str]:
+    """Calculate several dependency hashes with a single nix build.
+
+    Writes dummy hashes for every key at once, then builds all their
+    fixed-output derivations in one ``nix build --keep-going`` so Nix
+    evaluates once and fetches dependencies in parallel. Each reported
+    ``specified:``/``got:`` pair is mapped back to its key by derivation
+    name. Keys without known fixed-output derivation names skip the batch,
+    and they and any keys the batch could not resolve (e.g. a missing
+    attribute) are then built one at a time. During each of those builds
+    only that key holds the dummy hash, the other unresolved keys keep their
+    previous value, and mismatches are still attributed by derivation name.
+
+    Keys with an entry in ``locks`` are looked up in the dependency-hash
+    memo cache first and left out of the build on a hit.
+
+    The calculated hashes are stored in ``data`` (and hashes.json).
+
+    Args:
+        targets: Mapping of hash key to the package attribute that uses it
+            (e.g., {"cargoHash": ".#foo.native", "npmDepsHash": ".#foo"})
+        hashes_file: Path to hashes.json file
+        data: Dictionary containing package data
+        locks: Lockfile contents per hash key, used as memo keys
+
+    Returns:
+        Mapping of hash key to calculated hash in SRI format
+
+    Raises:
+        ValueError: If a hash cannot be extracted from the build output
+
+    """
+    locks = {
+        key: with_fetcher_version(lock, key, hashes_file.parent)
+        for key, lock in (locks or {}).items()
+    }
+    cache = DependencyHashCache.from_env() if locks else None
+    cached = _lookup_cached_hashes(cache, locks)
+    data.update(cached)
+
+    hash_keys = [key for key in targets if key not in cached]
+    if not hash_keys:
+        save_hashes(hashes_file, data)
+        return {key: data[key] for key in targets}
+    print(f"Calculating {', '.join(hash_keys)}...")
+    original_hashes = {key: data[key] for key in hash_keys}
+
+    batch_keys = [key for key in hash_keys if key in DEPENDENCY_DRV_SUFFIXES]
+    found: dict[str, str] = {}
+    if batch_keys:
+        for key in batch_keys:
+            data[key] = DUMMY_SHA256_HASH
+        save_hashes(hashes_file, data)
+        collector = _MismatchCollector(batch_keys)
+        try:
+            nix_build_until(_fod_attrs(targets, batch_keys), collector, keep_going=True)
+        except NixCommandError:
+            # Not every key reported a mismatch; fall back for the rest below.
+            print("Batch build did not report every hash")
+        found = collector.found
+
+    # Unresolved keys get their previous hash back, so that each fallback
+    # build below has a single dummy hash to report.
+    data.update(original_hashes)
+    data.update(found)
+    save_hashes(hashes_file, data)
+
+    for key in hash_keys:
+        if key in found:
+            continue
+        print(f"Falling back to a separate build for {key}...")
+        # Restores the key's previous hash itself if the build fails. A
+        # mismatch from any other known dependency derivation (e.g. one whose
+        # stale hash was just restored) is not taken as this key's hash.
+        data[key] = _build_dependency_hash(
+            targets[key],
+            key,
+            hashes_file,
+            data,
+            fod_only=True,
+            other_keys=targets.keys() | DEPENDENCY_DRV_SUFFIXES.keys(),
+        )
+        save_hashes(hashes_file, data)
+
+    if cache is not None:
+        for key in hash_keys & locks.keys():
+            cache.put(key, _fetcher_kind(key), locks[key], data[key])
+    return {key: data[key] for key in targets}
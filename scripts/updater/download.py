@@ -0,0 +1,224 @@
+"""Content-addressed cache for downloaded upstream artifacts.
+
+Several consumers need the same file during one run: ``calculate_url_hash``
+hashes a release tarball, then the updater opens the very same tarball to
+scan its ``Cargo.lock``, or ``extract_or_generate_lockfile`` unpacks an npm
+tarball that was just prefetched. :func:`cached_download` downloads a URL
+once and hands every later caller the local copy.
+
+Blobs are stored by their sha256, so two URLs serving identical bytes share
+one file. Within one process a URL is downloaded at most once, so every
+consumer sees the same bytes. Across runs, a small per-URL index maps each
+URL to its blob, but it is only trusted for URLs the caller marks
+``immutable`` (versioned release assets), and only for
+``DOWNLOAD_INDEX_MAX_AGE``; a ``latest`` binary or a branch archive is
+always downloaded afresh by a new run. Blobs are evicted
+least-recently-used once the cache exceeds its byte budget
+(``UPDATER_DOWNLOAD_CACHE_MAX_BYTES``), except those already handed out by
+this process. With ``UPDATER_NO_CACHE=1`` a temporary directory is used
+instead, which still deduplicates downloads within the current process.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .cache import atomic_write_bytes, cache_dir, cache_enabled, evict_lru, touch
+from .http import get_session
+
+# Default byte budget for cached blobs.
+DOWNLOAD_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Seconds after which a URL is looked up upstream again.
+DOWNLOAD_INDEX_MAX_AGE = 24 * 60 * 60
+
+# Upper bound on URL index entries kept on disk.
+DOWNLOAD_INDEX_MAX_ENTRIES = 10_000
+
+
+@dataclass(frozen=True, slots=True)
+class CachedDownload:
+    """A downloaded file stored in the cache."""
+
+    url: str
+    path: Path
+    sha256: str
+    size: int
+
+    @property
+    def file_url(self) -> str:
+        """Return a ``file://`` URL for handing the blob to Nix tools."""
+        return self.path.as_uri()
+
+
+class DownloadCache:
+    """Blob store keyed by content hash, with a URL index in front of it."""
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        max_bytes: int = DOWNLOAD_CACHE_MAX_BYTES,
+        max_age: float = DOWNLOAD_INDEX_MAX_AGE,
+    ) -> None:
+        """Use ``directory`` for blobs and the URL index."""
+        self.blobs = directory / "blobs"
+        self.index = directory / "urls"
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.index.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Downloads handed out by this process; never evicted while it runs.
+        self._handed_out: dict[str, CachedDownload] = {}
+
+    @classmethod
+    def from_env(cls) -> DownloadCache:
+        """Return the default cache, falling back to a per-process temp dir."""
+        max_bytes = int(
+            os.environ.get("UPDATER_DOWNLOAD_CACHE_MAX_BYTES", DOWNLOAD_CACHE_MAX_BYTES)
+        )
+        if cache_enabled():
+            return cls(cache_dir("downloads"), max_bytes=max_bytes)
+        tmp = Path(tempfile.mkdtemp(prefix="updater-downloads-"))
+        atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+        return cls(tmp, max_bytes=max_bytes)
+
+    def _index_path(self, url: str) -> Path:
+        return self.index / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(url, threading.Lock())
+
+    def _hand_out(self, download: CachedDownload) -> CachedDownload:
+        with self._locks_guard:
+            self._handed_out[download.url] = download
+        return download
+
+    def _in_use(self) -> set[Path]:
+        with self._locks_guard:
+            return {download.path for download in self._handed_out.values()}
+
+    def lookup(self, url: str, *, immutable: bool = False) -> CachedDownload | None:
+        """Return the cached download for ``url`` without fetching.
+
+        A copy already handed out by this process is always returned. Copies
+        from earlier runs are only returned for an ``immutable`` URL.
+        """
+        with self._locks_guard:
+            current = self._handed_out.get(url)
+        if current is not None and current.path.exists():
+            return current
+        if not immutable:
+            return None
+        index_path = self._index_path(url)
+        try:
+            entry = json.loads(index_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry["fetched"] > self.max_age:
+            return None
+        blob = self.blobs / entry["sha256"]
+        if not blob.exists():
+            return None
+        touch(blob)
+        return self._hand_out(
+            CachedDownload(
+                url=url, path=blob, sha256=entry["sha256"], size=entry["size"]
+            )
+        )
+
+    def fetch(
+        self, url: str, *, timeout: int = 60, immutable: bool = False
+    ) -> CachedDownload:
+        """Return the local copy of ``url``, downloading it on a miss.
+
+        Concurrent calls for the same URL wait for a single download. See
+        :meth:`lookup` for which cached copies are reused.
+
+        Raises:
+            urllib.error.URLError: If the download fails
+
+        """
+        with self._url_lock(url):
+            cached = self.lookup(url, immutable=immutable)
+            if cached is not None:
+                return cached
+
+            digest = hashlib.sha256()
+            size = 0
+            fd, tmp_name = tempfile.mkstemp(dir=self.blobs, prefix=".download-")
+            tmp = Path(tmp_name)
+            try:
+                with (
+                    os.fdopen(fd, "wb") as f,
+                    get_session().open(url, timeout=timeout) as response,
+                ):
+                    for chunk in response.iter_chunks():
+                        digest.update(chunk)
+                        size += len(chunk)
+                        f.write(chunk)
+                # Make room before publishing so the new blob is never evicted.
+                evict_lru(
+                    self.blobs,
+                    max_bytes=max(self.max_bytes - size, 0),
+                    keep=self._in_use(),
+                )
+                blob = self.blobs / digest.hexdigest()
+                tmp.replace(blob)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+
+            sha256 = digest.hexdigest()
+            entry = {"sha256": sha256, "size": size, "fetched": time.time()}
+            atomic_write_bytes(self._index_path(url), json.dumps(entry).encode())
+            evict_lru(self.index, max_entries=DOWNLOAD_INDEX_MAX_ENTRIES)
+            return self._hand_out(
+                CachedDownload(url=url, path=blob, sha256=sha256, size=size)
+            )
+
+
+_cache: DownloadCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_download_cache() -> DownloadCache:
+    """Return the process-wide download cache."""
+    global _cache  # noqa: PLW0603
+    with _cache_lock:
+        if _cache is None:
+            _cache = DownloadCache.from_env()
+        return _cache
+
+
+def cached_download(
+    url: str, *, timeout: int = 60, immutable: bool = False
+) -> CachedDownload:
+    """Download ``url`` once and return its local, content-addressed copy.
+
+    Args:
+        url: URL to download
+        timeout: Socket timeout in seconds
+        immutable: Whether the content behind ``url`` never changes, so a
+            copy from an earlier run may be reused
+
+    Returns:
+        The cached file with its sha256 (hex) and size
+
+    Raises:
+        urllib.error.URLError: If the download fails
+
+    """
+    return get_download_cache().fetch(url, timeout=timeout, immutable=immutable)
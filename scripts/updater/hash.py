@@ -1,30 +1,172 @@
 """Hash calculation utilities for Nix packages."""
 
 import base64
+import hashlib
+import logging
+import os
 import re
 
+from .artifacts import lookup_artifact_hash, record_artifact_hash
+from .download import CachedDownload, cached_download, get_download_cache
+from .http import CHUNK_SIZE, get_session
+from .nar import UnsupportedArchiveError, nar_sha256
 from .nix import nix_prefetch_url, nix_store_prefetch_file
 
+log = logging.getLogger(__name__)
+
 # Dummy hash used to trigger Nix build errors to extract correct hash
 DUMMY_SHA256_HASH = "sha256-AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA="
 
 
-def calculate_url_hash(url: str, *, unpack: bool = False) -> str:
+def calculate_url_hash(
+    url: str,
+    *,
+    unpack: bool = False,
+    add_to_store: bool = False,
+    immutable: bool = False,
+) -> str:
     """Calculate hash for a URL.
 
+    Flat (fetchurl) hashes are computed in-process by streaming the body
+    through sha256, without a Nix subprocess or a store write. Set
+    ``add_to_store`` when the file is also needed in the Nix store.
+
+    Unpacked (fetchzip) hashes are computed by ``nix-prefetch-url --unpack``
+    on the archive in the shared download cache, so a later consumer of the
+    same URL (tarball extraction, another hash) reads it from disk instead
+    of downloading it again. With ``UPDATER_NATIVE_NAR=1`` the archive is
+    serialized to NAR in-process instead (see :mod:`updater.nar`), still
+    falling back to Nix for archives that cannot be handled natively. Only
+    enable it where ``scripts/verify-nar-hash.py --corpus`` (and a check
+    of real sources) agrees with Nix.
+
+    Hashes of the pins recorded in the tree are looked up in the
+    repository-wide artifact index first (see :mod:`updater.artifacts`).
+    Other hashes are only reused across runs, from the index and the
+    download cache, when the caller marks the URL ``immutable``, i.e. its
+    content can never change (a versioned release asset). Any other URL is
+    downloaded and hashed again, so a replaced upstream file is noticed.
+
     Args:
         url: URL to calculate hash for
         unpack: Whether to unpack the archive (use True for fetchzip packages)
+        add_to_store: Whether to add a flat download to the Nix store
+        immutable: Whether the content behind ``url`` never changes
 
     Returns:
         Hash in SRI format (sha256-...)
 
     """
+    known = known_url_hash(
+        url, unpack=unpack, add_to_store=add_to_store, immutable=immutable
+    )
+    if known is not None:
+        return known
     if unpack:
-        # Use nix-prefetch-url --unpack for fetchzip packages
-        return nix_prefetch_url(url, unpack=True)
-    # Use nix store prefetch-file for regular fetchurl packages
-    return nix_store_prefetch_file(url)
+        sri = unpacked_url_hash(url, immutable=immutable)
+    elif add_to_store:
+        # Use nix store prefetch-file for regular fetchurl packages
+        sri = nix_store_prefetch_file(url)
+    else:
+        sri = flat_url_hash(url, immutable=immutable)
+    remember_url_hash(url, sri, unpack=unpack, immutable=immutable)
+    return sri
+
+
+def known_url_hash(
+    url: str, *, unpack: bool, add_to_store: bool, immutable: bool
+) -> str | None:
+    """Return the indexed hash :func:`calculate_url_hash` may reuse, if any."""
+    # A store prefetch is wanted for its side effect, so always run it.
+    if add_to_store:
+        return None
+    return lookup_artifact_hash(url, unpack=unpack, immutable=immutable)
+
+
+def remember_url_hash(url: str, sri: str, *, unpack: bool, immutable: bool) -> None:
+    """Record a computed hash in the artifact index if ``url`` is immutable."""
+    if immutable:
+        record_artifact_hash(url, sri, unpack=unpack)
+
+
+def flat_url_hash(url: str, *, immutable: bool = False) -> str:
+    """Compute the flat sha256 of a URL, reusing the download cache if immutable.
+
+    Returns:
+        Hash in SRI format (sha256-...)
+
+    """
+    cached = get_download_cache().lookup(url, immutable=immutable)
+    if cached is not None:
+        return hex_to_sri(cached.sha256)
+    return stream_url_hash(url)
+
+
+def native_unpacked_hash(
+    url: str, *, immutable: bool = False
+) -> tuple[CachedDownload, str | None]:
+    """Download an archive and compute its NAR hash in-process if enabled.
+
+    Returns:
+        The cached download and its hash in SRI format, or None if the
+        archive needs ``nix-prefetch-url --unpack`` on the download instead
+        (native hashing disabled, or an archive it cannot handle)
+
+    """
+    download = cached_download(url, immutable=immutable)
+    if not native_nar_enabled():
+        return download, None
+    try:
+        return download, hex_to_sri(nar_sha256(download.path))
+    except UnsupportedArchiveError as e:
+        log.warning("Falling back to nix-prefetch-url for %s: %s", url, e)
+        return download, None
+
+
+def native_nar_enabled() -> bool:
+    """Return whether unpacked hashes are computed in-process."""
+    return os.environ.get("UPDATER_NATIVE_NAR", "") not in {"", "0"}
+
+
+def unpacked_url_hash(url: str, *, immutable: bool = False) -> str:
+    """Compute the fetchzip-compatible NAR hash of an archive URL.
+
+    Args:
+        url: URL of a tar or zip archive
+        immutable: Whether a copy downloaded by an earlier run may be reused
+
+    Returns:
+        Hash in SRI format (sha256-...)
+
+    """
+    download, sri = native_unpacked_hash(url, immutable=immutable)
+    if sri is not None:
+        return sri
+    return nix_prefetch_url(download.file_url, unpack=True)
+
+
+def stream_url_hash(url: str, *, chunk_size: int = CHUNK_SIZE) -> str:
+    """Compute the flat sha256 of a URL's body without storing it.
+
+    The response is hashed in ``chunk_size`` pieces as it arrives, so memory
+    use stays constant even for multi-hundred-megabyte archives.
+
+    Args:
+        url: URL to hash
+        chunk_size: Number of bytes read per iteration
+
+    Returns:
+        Hash in SRI format (sha256-...)
+
+    Raises:
+        urllib.error.URLError: If the download fails
+
+    """
+    digest = hashlib.sha256()
+    with get_session().open(url, timeout=60) as response:
+        for chunk in response.iter_chunks(chunk_size):
+            digest.update(chunk)
+    return hex_to_sri(digest.hexdigest())
 
 
 def extract_hash_from_build_error(error_output: str) -> str | None:
@@ -57,3 +199,33 @@ def hex_to_sri(hex_hash: str, algo: str = "sha256") -> str:
     hash_bytes = bytes.fromhex(hex_hash)
     b64_hash = base64.b64encode(hash_bytes).decode("ascii")
     return f"{algo}-{b64_hash}"
+
+
+# Nix's base32 alphabet omits e, o, u and t to avoid accidental words.
+NIX_BASE32_ALPHABET = "0123456789abcdfghijklmnpqrsvwxyz"
+
+
+def nix_base32_to_sri(b32_hash: str, algo: str = "sha256") -> str:
+    """Convert a Nix base32 hash (as printed by nix-prefetch-url) to SRI format.
+
+    Nix base32 lists 5-bit digits from the most significant end of the
+    little-endian hash bytes, so the string is read as one big integer.
+
+    Raises:
+        ValueError: If the string is not valid Nix base32
+
+    """
+    size = len(b32_hash) * 5 // 8
+    value = 0
+    for char in b32_hash:
+        digit = NIX_BASE32_ALPHABET.find(char)
+        if digit < 0:
+            msg = f"Invalid character {char!r} in Nix base32 hash {b32_hash!r}"
+            raise ValueError(msg)
+        value = (value << 5) | digit
+    if value >> (size * 8):
+        msg = f"Nix base32 hash {b32_hash!r} has excess bits"
+        raise ValueError(msg)
+    hash_bytes = value.to_bytes(size, "little")
+    b64_hash = base64.b64encode(hash_bytes).decode("ascii")
+    return f"{algo}-{b64_hash}"
@@ -1,30 +1,793 @@
-"""HTTP utilities for fetching data from URLs."""
+"""HTTP utilities for fetching data from URLs.
 
+All helpers go through a single process-wide :class:`HttpSession` that keeps
+persistent connections per host. A typical updater run talks to
+api.github.com, raw.githubusercontent.com and registry.npmjs.org many times,
+so reusing connections saves a TCP + TLS handshake on every request after
+the first one.
+
+Successful responses that carry an ``ETag`` or ``Last-Modified`` validator
+are stored in an on-disk :class:`HttpCache`. Later requests for the same URL
+are sent as conditional requests, and a ``304 Not Modified`` answer is served
+from disk. Most scheduled runs find nothing changed upstream, so this avoids
+re-downloading release metadata, and on GitHub a 304 does not count against
+the rate limit. Set ``UPDATER_NO_CACHE=1`` or pass ``cache=False`` to bypass.
+
+Within one run, :func:`fetch_text` (and everything built on it) also
+memoizes response bodies by URL in memory and coalesces concurrent requests
+for the same URL into a single fetch, so an updater that reads the same
+upstream file from several helpers downloads it once.
+
+Requests to api.github.com are paced by a :class:`GitHubRateLimiter`, which
+follows the ``X-RateLimit-*`` headers so that a parallel sweep slows down
+and waits for the quota to reset instead of failing halfway through.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.client
 import json
 import os
-import urllib.request
-from typing import Any
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import zlib
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any
+
+from .cache import atomic_write_bytes, cache_dir, cache_enabled, evict_lru, touch
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from email.message import Message
+    from pathlib import Path
+
+USER_AGENT = "llm-agents-nix-updater"
+
+# Maximum number of redirects followed for a single request.
+MAX_REDIRECTS = 10
+
+# Idle connections kept per (scheme, host, port).
+MAX_IDLE_PER_HOST = 4
+
+# Chunk size used when streaming response bodies.
+CHUNK_SIZE = 1 << 16
+
+# Size cap for the conditional-request cache; least recently used entries
+# are evicted beyond it.
+HTTP_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+
+# Errors raised when a pooled connection was closed by the server while idle.
+# Requests that fail this way on a reused connection are retried once.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+_PoolKey = tuple[str, str, int]
+
+GITHUB_API_HOST = "api.github.com"
+
+# Concurrent GitHub API requests allowed while plenty of quota is left.
+GITHUB_MAX_CONCURRENCY = 8
+
+# Remaining requests per concurrent slot: once the quota drops below
+# GITHUB_MAX_CONCURRENCY * GITHUB_QUOTA_PER_SLOT, concurrency shrinks
+# proportionally down to a single request at a time.
+GITHUB_QUOTA_PER_SLOT = 50
 
+# Retries of a rate-limited (403/429) GitHub request before giving up.
+GITHUB_MAX_RETRIES = 5
 
-def _github_request(url: str) -> urllib.request.Request:
-    """Build an authenticated GitHub API request.
+# First backoff delay in seconds for secondary rate limits; doubles on
+# every retry and is jittered by up to another 100%.
+GITHUB_BACKOFF_BASE = 1.0
+
+# Longest single wait for a rate limit to lift. The primary limit resets
+# hourly, so this only refuses absurd Retry-After / reset values.
+GITHUB_MAX_WAIT = 3660.0
+
+_RATE_LIMIT_STATUSES = frozenset({403, 429})
+
+
+def _github_headers(url: str) -> dict[str, str]:
+    """Build authentication headers for a GitHub API request.
 
     Uses the GITHUB_TOKEN environment variable so that CI jobs don't hit
     the unauthenticated rate limit (60 req/h → 5 000 req/h).
     """
-    req = urllib.request.Request(url)
+    if urllib.parse.urlsplit(url).hostname != "api.github.com":
+        return {}
     token = os.environ.get("GITHUB_TOKEN", "")
-    if token:
-        req.add_header("Authorization", f"token {token}")
-    return req
+    if not token:
+        return {}
+    return {"Authorization": f"token {token}"}
+
+
+def _decode_body(data: bytes, encoding: str) -> bytes:
+    """Undo a gzip or deflate Content-Encoding."""
+    encoding = encoding.strip().lower()
+    if encoding in {"gzip", "x-gzip"}:
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        # RFC 9110 deflate is zlib-wrapped, but some servers send raw deflate.
+        try:
+            return zlib.decompress(data)
+        except zlib.error:
+            return zlib.decompress(data, -zlib.MAX_WBITS)
+    return data
+
+
+@dataclass(frozen=True, slots=True)
+class Response:
+    """A fully read HTTP response."""
+
+    url: str
+    status: int
+    headers: Message
+    body: bytes
+
+    def text(self, encoding: str = "utf-8") -> str:
+        """Return the body decoded as text."""
+        return self.body.decode(encoding)
+
+
+class HttpCache:
+    """On-disk store of validated responses for conditional requests.
+
+    Each entry is a single file named after the request key, holding a JSON
+    metadata line (final URL and response headers) followed by the decoded
+    body. Hits bump the file's mtime, and the directory is pruned to
+    ``max_bytes`` in least-recently-used order after every store.
+    """
+
+    def __init__(
+        self, directory: Path, *, max_bytes: int = HTTP_CACHE_MAX_BYTES
+    ) -> None:
+        """Use ``directory`` for cache entries."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_env(cls) -> HttpCache | None:
+        """Return the default cache, or None if caching is disabled."""
+        if not cache_enabled():
+            return None
+        return cls(cache_dir("http"))
+
+    def _path(self, url: str, headers: dict[str, str]) -> Path:
+        key = json.dumps([url, sorted(headers.items())])
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return self.directory / f"{digest}.entry"
+
+    def load(self, url: str, headers: dict[str, str]) -> Response | None:
+        """Return the stored response for a request, if any."""
+        path = self._path(url, headers)
+        try:
+            raw = path.read_bytes()
+        except OSError:
+            return None
+        meta_line, _, body = raw.partition(b"\n")
+        try:
+            meta = json.loads(meta_line)
+        except ValueError:
+            path.unlink(missing_ok=True)
+            return None
+        message = http.client.HTTPMessage()
+        for name, value in meta["headers"]:
+            message[name] = value
+        return Response(url=meta["url"], status=200, headers=message, body=body)
+
+    def touch(self, url: str, headers: dict[str, str]) -> None:
+        """Mark the entry for a request as recently used."""
+        touch(self._path(url, headers))
+
+    def store(self, url: str, headers: dict[str, str], response: Response) -> None:
+        """Store ``response`` if it carries a validator and may be cached."""
+        cache_control = response.headers.get("Cache-Control", "")
+        if "no-store" in cache_control.lower():
+            return
+        if not _conditional_headers(response):
+            return
+        meta = {
+            "url": response.url,
+            # Bodies are stored decoded, so the encoding headers no longer apply.
+            "headers": [
+                (name, value)
+                for name, value in response.headers.items()
+                if name.lower() not in {"content-encoding", "content-length"}
+            ],
+        }
+        data = json.dumps(meta).encode() + b"\n" + response.body
+        atomic_write_bytes(self._path(url, headers), data)
+        evict_lru(self.directory, max_bytes=self.max_bytes)
+
+
+def _conditional_headers(cached: Response) -> dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from a stored response."""
+    headers: dict[str, str] = {}
+    etag = cached.headers.get("ETag")
+    if etag:
+        headers["If-None-Match"] = etag
+    last_modified = cached.headers.get("Last-Modified")
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+@dataclass(slots=True)
+class _Quota:
+    """Last known GitHub API quota for one token."""
+
+    remaining: int | None = None
+    reset: float = 0.0
+    in_flight: int = 0
+
+
+def _header_number(headers: Message, name: str) -> float | None:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after(headers: Message, now: float) -> float | None:
+    """Parse a Retry-After header (seconds or HTTP date) into a delay."""
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+class GitHubRateLimiter:
+    """Schedule GitHub API requests against the quota GitHub reports.
+
+    Quota is tracked per token from the ``X-RateLimit-Remaining`` and
+    ``X-RateLimit-Reset`` response headers. As the remaining budget drains,
+    fewer requests may be in flight at once; when it is exhausted, new
+    requests sleep until the reset time instead of failing. Rate-limited
+    responses (403/429) are retried after ``Retry-After``, after the reset
+    for an exhausted primary limit, or with jittered exponential backoff
+    for secondary limits.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = GITHUB_MAX_CONCURRENCY,
+        quota_per_slot: int = GITHUB_QUOTA_PER_SLOT,
+        max_wait: float = GITHUB_MAX_WAIT,
+        backoff_base: float = GITHUB_BACKOFF_BASE,
+    ) -> None:
+        """Create a limiter with no quota information yet."""
+        self.max_concurrency = max_concurrency
+        self.quota_per_slot = quota_per_slot
+        self.max_wait = max_wait
+        self.backoff_base = backoff_base
+        self._quotas: dict[str, _Quota] = {}
+        self._cond = threading.Condition()
+
+    def _allowed(self, quota: _Quota) -> int:
+        if quota.remaining is None:
+            return self.max_concurrency
+        slots = quota.remaining // self.quota_per_slot
+        return max(1, min(self.max_concurrency, slots))
+
+    def _reset_wait(self, quota: _Quota) -> float:
+        """Seconds until an exhausted quota resets (0 if not exhausted)."""
+        if quota.remaining != 0:
+            return 0.0
+        wait = quota.reset - time.time()
+        if wait <= 0:
+            # The window has rolled over; the next response reports anew.
+            quota.remaining = None
+            return 0.0
+        return min(wait + 1, self.max_wait)
+
+    @contextmanager
+    def slot(self, token: str) -> Iterator[None]:
+        """Hold one request slot for ``token``, waiting for quota if needed."""
+        with self._cond:
+            quota = self._quotas.setdefault(token, _Quota())
+            while True:
+                wait = self._reset_wait(quota)
+                if wait > 0:
+                    print(f"GitHub API rate limit exhausted, waiting {wait:.0f}s...")
+                    self._cond.wait(wait)
+                    if quota.remaining == 0 and quota.reset <= time.time():
+                        quota.remaining = None
+                    continue
+                if quota.in_flight < self._allowed(quota):
+                    break
+                self._cond.wait()
+            quota.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                quota.in_flight -= 1
+                self._cond.notify_all()
+
+    def observe(self, token: str, headers: Message) -> None:
+        """Record the quota reported by a GitHub API response."""
+        remaining = _header_number(headers, "X-RateLimit-Remaining")
+        reset = _header_number(headers, "X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self._cond:
+            quota = self._quotas.setdefault(token, _Quota())
+            if reset > quota.reset or quota.remaining is None:
+                quota.remaining = int(remaining)
+                quota.reset = reset
+            elif reset == quota.reset:
+                # Responses can arrive out of order; the lowest count wins.
+                quota.remaining = min(quota.remaining, int(remaining))
+            self._cond.notify_all()
+
+    def retry_delay(
+        self, status: int, headers: Message, body: bytes, attempt: int
+    ) -> float | None:
+        """Return how long to wait before retrying a failed request.
+
+        Returns:
+            Seconds to sleep, or None if the response is not a rate limit
+            (or retrying would exceed ``GITHUB_MAX_RETRIES``/``max_wait``)
+
+        """
+        if status not in _RATE_LIMIT_STATUSES or attempt >= GITHUB_MAX_RETRIES:
+            return None
+        now = time.time()
+        retry_after = _retry_after(headers, now)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_wait else None
+        if headers.get("X-RateLimit-Remaining") == "0":
+            # Primary limit: slot() already sleeps until the reset.
+            reset = _header_number(headers, "X-RateLimit-Reset") or now
+            return 0.0 if reset - now <= self.max_wait else None
+        if status == 429 or b"secondary rate limit" in body.lower():  # noqa: PLR2004
+            delay = self.backoff_base * 2.0**attempt
+            return delay * (1 + random.random())  # noqa: S311 - jitter, not crypto
+        return None
+
+
+class StreamResponse:
+    """An HTTP response whose body is read incrementally.
+
+    Obtained from :meth:`HttpSession.open`. Only the identity encoding is
+    requested, so the body is normally passed through unchanged. Servers
+    that compress anyway are decoded in :meth:`iter_chunks`, the same way
+    Nix's fetchers undo Content-Encoding, so the bytes match what a Nix
+    fetcher would hash.
+    """
+
+    def __init__(self, url: str, response: http.client.HTTPResponse) -> None:
+        """Wrap a raw response for the final URL after redirects."""
+        self.url = url
+        self.status = response.status
+        self.headers: Message = response.headers
+        self._response = response
+
+    def read(self, amt: int | None = None) -> bytes:
+        """Read up to ``amt`` raw bytes of the body (everything if ``None``)."""
+        return self._response.read(amt)
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the decoded body, reading ``chunk_size`` bytes at a time."""
+        encoding = self.headers.get("Content-Encoding", "").strip().lower()
+        decoder = None
+        if encoding in {"gzip", "x-gzip"}:
+            decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            decoder = zlib.decompressobj()
+        while chunk := self._response.read(chunk_size):
+            yield decoder.decompress(chunk) if decoder else chunk
+        if decoder:
+            yield decoder.flush()
+
+
+class HttpSession:
+    """Keep-alive HTTP client with a small connection pool per host.
+
+    Safe to share between threads: each request checks a connection out of
+    the pool and returns it once the response body has been fully read.
+    """
 
+    def __init__(
+        self,
+        *,
+        max_idle_per_host: int = MAX_IDLE_PER_HOST,
+        cache: HttpCache | None = None,
+        rate_limiter: GitHubRateLimiter | None = None,
+    ) -> None:
+        """Create an empty session, optionally backed by a response cache.
 
-def fetch_text(url: str, *, timeout: int = 30) -> str:
+        When ``rate_limiter`` is given, GitHub API requests are scheduled
+        and retried through it.
+        """
+        self._max_idle_per_host = max_idle_per_host
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self._idle: dict[_PoolKey, list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _acquire(
+        self, key: _PoolKey, timeout: float
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        """Return a pooled connection for ``key`` and whether it was reused."""
+        with self._lock:
+            conns = self._idle.get(key)
+            conn = conns.pop() if conns else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _release(
+        self,
+        key: _PoolKey,
+        conn: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+    ) -> None:
+        """Return ``conn`` to the pool if its response was consumed cleanly."""
+        if response.will_close or not response.isclosed():
+            conn.close()
+            return
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self._max_idle_per_host:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def _send(
+        self,
+        url: str,
+        headers: dict[str, str],
+        timeout: float,
+        *,
+        method: str = "GET",
+        body: bytes | None = None,
+    ) -> tuple[_PoolKey, http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send a single request, retrying once on a stale connection."""
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in {"http", "https"} or not parts.hostname:
+            msg = f"Unsupported URL: {url}"
+            raise urllib.error.URLError(msg)
+        port = parts.port or (443 if scheme == "https" else 80)
+        key: _PoolKey = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        request_headers = {
+            "User-Agent": USER_AGENT,
+            **_github_headers(url),
+            **headers,
+        }
+
+        while True:
+            conn, reused = self._acquire(key, timeout)
+            try:
+                conn.request(method, path, body=body, headers=request_headers)
+                response = conn.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            return key, conn, response
+
+    def _limiter_for(self, url: str) -> GitHubRateLimiter | None:
+        """Return the rate limiter governing ``url``, if any."""
+        if urllib.parse.urlsplit(url).hostname != GITHUB_API_HOST:
+            return None
+        return self.rate_limiter
+
+    @staticmethod
+    def _retry_delay(
+        limiter: GitHubRateLimiter | None,
+        response: http.client.HTTPResponse,
+        body: bytes,
+        attempt: int,
+    ) -> float | None:
+        """Return the backoff before retrying a rate-limited GitHub request."""
+        if limiter is None:
+            return None
+        encoding = response.getheader("Content-Encoding", "")
+        try:
+            body = _decode_body(body, encoding)
+        except zlib.error:
+            body = b""
+        delay = limiter.retry_delay(response.status, response.headers, body, attempt)
+        if delay is not None:
+            print(
+                f"GitHub API rate limited ({response.status}), "
+                f"retrying in {delay:.1f}s..."
+            )
+        return delay
+
+    @contextmanager
+    def _open(
+        self,
+        url: str,
+        headers: dict[str, str],
+        timeout: float,
+        *,
+        method: str = "GET",
+        body: bytes | None = None,
+    ) -> Iterator[tuple[str, http.client.HTTPResponse]]:
+        """Follow redirects and yield the final URL and raw response.
+
+        Like urllib, a request body is only re-sent for 307/308 redirects;
+        other redirects are followed with a plain GET.
+
+        Raises ``urllib.error.HTTPError`` for error statuses and
+        ``urllib.error.URLError`` for connection failures, matching the
+        exceptions ``urllib.request.urlopen`` would raise.
+        """
+        redirects = 0
+        attempt = 0
+        while redirects <= MAX_REDIRECTS:
+            limiter = self._limiter_for(url)
+            token = _github_headers(url).get("Authorization", "")
+            try:
+                with limiter.slot(token) if limiter else nullcontext():
+                    key, conn, response = self._send(
+                        url, headers, timeout, method=method, body=body
+                    )
+            except (OSError, http.client.HTTPException) as e:
+                if isinstance(e, urllib.error.URLError):
+                    raise
+                raise urllib.error.URLError(e) from e
+            if limiter is not None:
+                limiter.observe(token, response.headers)
+
+            location = response.getheader("Location")
+            if response.status in _REDIRECT_STATUSES and location:
+                response.read()
+                self._release(key, conn, response)
+                url = urllib.parse.urljoin(url, location)
+                if response.status not in {307, 308}:
+                    method, body = "GET", None
+                redirects += 1
+                continue
+
+            if response.status >= 400:  # noqa: PLR2004
+                error_body = response.read()
+                self._release(key, conn, response)
+                delay = self._retry_delay(limiter, response, error_body, attempt)
+                if delay is not None:
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                raise urllib.error.HTTPError(
+                    url, response.status, response.reason, response.headers, None
+                )
+
+            try:
+                yield url, response
+            finally:
+                self._release(key, conn, response)
+            return
+
+        msg = f"Too many redirects fetching {url}"
+        raise urllib.error.URLError(msg)
+
+    def request(
+        self,
+        url: str,
+        *,
+        headers: dict[str, str] | None = None,
+        timeout: float = 30,
+        cache: bool = True,
+    ) -> Response:
+        """Fetch ``url`` and return the fully read, decoded response.
+
+        gzip and deflate transfer encodings are negotiated and undone
+        transparently. When the session has a cache and ``cache`` is true,
+        the request is made conditional on any stored validators and a
+        ``304 Not Modified`` is answered from the cache.
+
+        Raises:
+            urllib.error.HTTPError: If the server returns an error status
+            urllib.error.URLError: If the request fails
+
+        """
+        caller_headers = headers or {}
+        http_cache = self.cache if cache else None
+        cached = http_cache.load(url, caller_headers) if http_cache else None
+
+        request_headers = {"Accept-Encoding": "gzip, deflate", **caller_headers}
+        if cached is not None:
+            request_headers.update(_conditional_headers(cached))
+        with self._open(url, request_headers, timeout) as (final_url, response):
+            body = response.read()
+
+        if http_cache is not None and cached is not None and response.status == 304:  # noqa: PLR2004
+            http_cache.touch(url, caller_headers)
+            return cached
+
+        encoding = response.getheader("Content-Encoding", "")
+        result = Response(
+            url=final_url,
+            status=response.status,
+            headers=response.headers,
+            body=_decode_body(body, encoding),
+        )
+        if http_cache is not None and result.status == 200:  # noqa: PLR2004
+            http_cache.store(url, caller_headers, result)
+        return result
+
+    def post(
+        self,
+        url: str,
+        data: bytes,
+        *,
+        headers: dict[str, str] | None = None,
+        timeout: float = 30,
+    ) -> Response:
+        """POST ``data`` to ``url`` and return the decoded response.
+
+        POST responses are never cached.
+
+        Raises:
+            urllib.error.HTTPError: If the server returns an error status
+            urllib.error.URLError: If the request fails
+
+        """
+        request_headers = {"Accept-Encoding": "gzip, deflate", **(headers or {})}
+        with self._open(url, request_headers, timeout, method="POST", body=data) as (
+            final_url,
+            response,
+        ):
+            body = response.read()
+        return Response(
+            url=final_url,
+            status=response.status,
+            headers=response.headers,
+            body=_decode_body(body, response.getheader("Content-Encoding", "")),
+        )
+
+    @contextmanager
+    def open(
+        self,
+        url: str,
+        *,
+        headers: dict[str, str] | None = None,
+        timeout: float = 30,
+    ) -> Iterator[StreamResponse]:
+        """Open ``url`` for streaming; the connection is pooled again on exit.
+
+        Raises:
+            urllib.error.HTTPError: If the server returns an error status
+            urllib.error.URLError: If the request fails
+
+        """
+        request_headers = {"Accept-Encoding": "identity", **(headers or {})}
+        with self._open(url, request_headers, timeout) as (final_url, response):
+            yield StreamResponse(final_url, response)
+
+
+_session: HttpSession | None = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> HttpSession:
+    """Return the process-wide HTTP session shared by all helpers."""
+    global _session  # noqa: PLW0603
+    with _session_lock:
+        if _session is None:
+            _session = HttpSession(
+                cache=HttpCache.from_env(), rate_limiter=GitHubRateLimiter()
+            )
+        return _session
+
+
+class FetchMemo:
+    """In-memory memo of response bodies for the lifetime of a run.
+
+    The first caller for a URL performs the fetch; callers arriving while it
+    is in flight wait for that result instead of issuing their own request.
+    Failures are handed to the waiting callers but not remembered, so a
+    later call retries.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty memo."""
+        self._lock = threading.Lock()
+        self._bodies: dict[str, Future[str]] = {}
+
+    def get(self, url: str, fetch: Callable[[], str]) -> str:
+        """Return the body of ``url``, calling ``fetch`` at most once at a time.
+
+        Args:
+            url: URL used as the memo key
+            fetch: Function that fetches the body when it is not memoized
+
+        Returns:
+            Response body as text
+
+        """
+        with self._lock:
+            future = self._bodies.get(url)
+            if future is None:
+                future = self._bodies[url] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result()
+
+        try:
+            body = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._bodies[url]
+            future.set_exception(e)
+            raise
+        future.set_result(body)
+        return body
+
+    def clear(self) -> None:
+        """Forget all memoized bodies."""
+        with self._lock:
+            self._bodies.clear()
+
+
+_fetch_memo = FetchMemo()
+
+
+def get_fetch_memo() -> FetchMemo:
+    """Return the process-wide memo used by :func:`fetch_text`."""
+    return _fetch_memo
+
+
+def fetch_text(url: str, *, timeout: int = 30, cache: bool = True) -> str:
     """Fetch text content from a URL.
 
+    With ``cache`` (the default), the body is memoized for the rest of the
+    run and concurrent calls for the same URL share a single request (see
+    :class:`FetchMemo`).
+
     Args:
         url: URL to fetch
         timeout: Request timeout in seconds
+        cache: Whether to use the run memo and revalidate against the
+            on-disk response cache
 
     Returns:
         Response body as text
@@ -33,20 +796,24 @@ def fetch_text(url: str, *, timeout: int = 30) -> str:
         urllib.error.URLError: If the request fails
 
     """
-    target: str | urllib.request.Request = url
-    if "api.github.com" in url:
-        target = _github_request(url)
-    with urllib.request.urlopen(target, timeout=timeout) as response:
-        data: bytes = response.read()
-        return data.decode("utf-8")
 
+    def fetch() -> str:
+        return get_session().request(url, timeout=timeout, cache=cache).text()
 
-def fetch_json(url: str, *, timeout: int = 30) -> dict[str, Any] | list[Any]:
+    if not cache:
+        return fetch()
+    return _fetch_memo.get(url, fetch)
+
+
+def fetch_json(
+    url: str, *, timeout: int = 30, cache: bool = True
+) -> dict[str, Any] | list[Any]:
     """Fetch and parse JSON from a URL.
 
     Args:
         url: URL to fetch
         timeout: Request timeout in seconds
+        cache: Whether to revalidate against the on-disk response cache
 
     Returns:
         Parsed JSON data (dict or list)
@@ -56,6 +823,34 @@ def fetch_json(url: str, *, timeout: int = 30) -> dict[str, Any] | list[Any]:
         json.JSONDecodeError: If response is not valid JSON
 
     """
-    text = fetch_text(url, timeout=timeout)
+    text = fetch_text(url, timeout=timeout, cache=cache)
     result: dict[str, Any] | list[Any] = json.loads(text)
     return result
+
+
+def post_json(
+    url: str, payload: dict[str, Any], *, timeout: int = 30
+) -> dict[str, Any] | list[Any]:
+    """POST a JSON payload and parse the JSON response.
+
+    Args:
+        url: URL to post to
+        payload: JSON object to send as the request body
+        timeout: Request timeout in seconds
+
+    Returns:
+        Parsed JSON data (dict or list)
+
+    Raises:
+        urllib.error.URLError: If the request fails
+        json.JSONDecodeError: If response is not valid JSON
+
+    """
+    response = get_session().post(
+        url,
+        json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+        timeout=timeout,
+    )
+    result: dict[str, Any] | list[Any] = json.loads(response.text())
+    return result
@@ -0,0 +1,291 @@
+"""NAR serialization of archives for fetchzip-style (unpacked) hashes.
+
+``nix-prefetch-url --unpack`` extracts an archive, uses its single top-level
+entry as the root if there is exactly one (the usual ``<repo>-<tag>/``
+directory of a GitHub tarball), and hashes the NAR serialization of the
+result. This module does the same in-process: it reads a tar (gzip, bzip2
+or xz compressed) or zip archive, builds the file tree in memory and feeds
+its NAR encoding straight into sha256.
+
+Tar archives are read as a stream. NAR orders directory entries by name
+while tar stores them in arbitrary order, so regular file contents are
+spooled to a single temporary file until the tree is complete. Zip members
+are read back from the archive itself.
+
+Only the properties NAR records are kept: entry type, the executable bit of
+regular files (owner execute, as Nix checks ``S_IXUSR``), file contents and
+symlink targets. Archives using anything else (device nodes, unsafe paths,
+zstd compression on older Pythons) raise :class:`UnsupportedArchiveError`
+so callers can fall back to Nix.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import shutil
+import stat
+import tarfile
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from typing import IO, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from pathlib import Path
+
+NAR_MAGIC = b"nix-archive-1"
+
+# Chunk size used when copying file contents.
+CHUNK_SIZE = 1 << 16
+
+# zip "version made by" host system for Unix, whose external attributes
+# carry a st_mode in the upper 16 bits.
+_ZIP_UNIX = 3
+
+
+class UnsupportedArchiveError(Exception):
+    """Raised when an archive cannot be hashed without Nix."""
+
+
+@dataclass(slots=True)
+class _File:
+    executable: bool
+    size: int
+    chunks: Callable[[], Iterator[bytes]]
+
+
+@dataclass(slots=True)
+class _Symlink:
+    target: bytes
+
+
+@dataclass(slots=True)
+class _Directory:
+    entries: dict[bytes, _Node] = field(default_factory=dict)
+
+
+_Node = _File | _Symlink | _Directory
+
+
+def _split_path(name: str) -> list[bytes]:
+    """Split an archive member name into NAR entry names."""
+    parts = [p for p in name.split("/") if p not in {"", "."}]
+    if ".." in parts:
+        msg = f"archive member escapes the root: {name!r}"
+        raise UnsupportedArchiveError(msg)
+    return [p.encode("utf-8", "surrogateescape") for p in parts]
+
+
+def _lookup(root: _Directory, name: str) -> _Node | None:
+    node: _Node = root
+    for part in _split_path(name):
+        if not isinstance(node, _Directory) or part not in node.entries:
+            return None
+        node = node.entries[part]
+    return node
+
+
+def _insert(root: _Directory, name: str, node: _Node) -> None:
+    """Place ``node`` at ``name``, creating parent directories as needed."""
+    parts = _split_path(name)
+    if not parts:
+        return
+    parent = root
+    for part in parts[:-1]:
+        child = parent.entries.get(part)
+        if child is None:
+            child = parent.entries[part] = _Directory()
+        elif not isinstance(child, _Directory):
+            msg = f"archive member below a non-directory: {name!r}"
+            raise UnsupportedArchiveError(msg)
+        parent = child
+    existing = parent.entries.get(parts[-1])
+    if isinstance(node, _Directory) and isinstance(existing, _Directory):
+        # Explicit directory entries may follow their children.
+        return
+    parent.entries[parts[-1]] = node
+
+
+def _spilled(spill: IO[bytes], offset: int, size: int) -> Callable[[], Iterator[bytes]]:
+    """Return a reader for ``size`` bytes at ``offset`` of the spool file."""
+
+    def chunks() -> Iterator[bytes]:
+        spill.seek(offset)
+        remaining = size
+        while remaining:
+            chunk = spill.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+    return chunks
+
+
+def _add_tar_member(
+    root: _Directory,
+    tar: tarfile.TarFile,
+    member: tarfile.TarInfo,
+    spill: IO[bytes],
+) -> None:
+    """Add one tar member to the tree, spooling regular file contents."""
+    if member.isdir():
+        _insert(root, member.name, _Directory())
+    elif member.issym():
+        target = member.linkname.encode("utf-8", "surrogateescape")
+        _insert(root, member.name, _Symlink(target))
+    elif member.islnk():
+        linked = _lookup(root, member.linkname)
+        if not isinstance(linked, _File):
+            msg = f"hard link to unknown file: {member.linkname!r}"
+            raise UnsupportedArchiveError(msg)
+        _insert(root, member.name, linked)
+    elif member.isreg():
+        src = tar.extractfile(member)
+        if src is None:
+            msg = f"unreadable archive member: {member.name!r}"
+            raise UnsupportedArchiveError(msg)
+        offset = spill.seek(0, 2)
+        shutil.copyfileobj(src, spill, CHUNK_SIZE)
+        size = spill.tell() - offset
+        executable = bool(member.mode & stat.S_IXUSR)
+        _insert(
+            root, member.name, _File(executable, size, _spilled(spill, offset, size))
+        )
+    else:
+        msg = f"unsupported member type for {member.name!r}"
+        raise UnsupportedArchiveError(msg)
+
+
+def _read_tar(fileobj: IO[bytes], spill: IO[bytes]) -> _Directory:
+    """Build the tree of a (compressed) tar stream, spooling contents."""
+    root = _Directory()
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|*", encoding="utf-8") as tar:
+            for member in tar:
+                _add_tar_member(root, tar, member, spill)
+    except tarfile.TarError as e:
+        msg = f"cannot read tar archive: {e}"
+        raise UnsupportedArchiveError(msg) from e
+    return root
+
+
+def _read_zip(zf: zipfile.ZipFile) -> _Directory:
+    """Build the tree of a zip archive; contents are read back lazily."""
+    root = _Directory()
+
+    def member(info: zipfile.ZipInfo) -> Callable[[], Iterator[bytes]]:
+        def chunks() -> Iterator[bytes]:
+            with zf.open(info) as f:
+                while chunk := f.read(CHUNK_SIZE):
+                    yield chunk
+
+        return chunks
+
+    for info in zf.infolist():
+        mode = info.external_attr >> 16 if info.create_system == _ZIP_UNIX else 0
+        if info.is_dir():
+            _insert(root, info.filename, _Directory())
+        elif stat.S_ISLNK(mode):
+            _insert(root, info.filename, _Symlink(zf.read(info)))
+        else:
+            executable = bool(mode & stat.S_IXUSR)
+            _insert(
+                root, info.filename, _File(executable, info.file_size, member(info))
+            )
+    return root
+
+
+class _NarWriter:
+    """Write the NAR encoding of a tree into a hash object."""
+
+    def __init__(self, sink: hashlib._Hash) -> None:
+        self._sink = sink
+
+    def _pad(self, size: int) -> None:
+        if size % 8:
+            self._sink.update(b"\0" * (8 - size % 8))
+
+    def _str(self, data: bytes) -> None:
+        self._sink.update(len(data).to_bytes(8, "little"))
+        self._sink.update(data)
+        self._pad(len(data))
+
+    def archive(self, node: _Node) -> None:
+        self._str(NAR_MAGIC)
+        self._node(node)
+
+    def _node(self, node: _Node) -> None:
+        self._str(b"(")
+        if isinstance(node, _File):
+            self._str(b"type")
+            self._str(b"regular")
+            if node.executable:
+                self._str(b"executable")
+                self._str(b"")
+            self._str(b"contents")
+            self._sink.update(node.size.to_bytes(8, "little"))
+            written = 0
+            for chunk in node.chunks():
+                self._sink.update(chunk)
+                written += len(chunk)
+            if written != node.size:
+                msg = f"expected {node.size} bytes of file contents, read {written}"
+                raise UnsupportedArchiveError(msg)
+            self._pad(node.size)
+        elif isinstance(node, _Symlink):
+            self._str(b"type")
+            self._str(b"symlink")
+            self._str(b"target")
+            self._str(node.target)
+        else:
+            self._str(b"type")
+            self._str(b"directory")
+            for name in sorted(node.entries):
+                self._str(b"entry")
+                self._str(b"(")
+                self._str(b"name")
+                self._str(name)
+                self._str(b"node")
+                self._node(node.entries[name])
+                self._str(b")")
+        self._str(b")")
+
+
+def _unpacked_root(root: _Directory) -> _Node:
+    """Apply nix-prefetch-url's single top-level entry stripping."""
+    if not root.entries:
+        msg = "archive is empty"
+        raise UnsupportedArchiveError(msg)
+    if len(root.entries) == 1:
+        return next(iter(root.entries.values()))
+    return root
+
+
+def nar_sha256(archive: Path) -> str:
+    """Compute the sha256 of the NAR of an unpacked archive.
+
+    The result matches ``nix-prefetch-url --unpack`` for the same file.
+
+    Args:
+        archive: Path to a tar (optionally gzip/bzip2/xz compressed) or zip file
+
+    Returns:
+        Hex-encoded sha256 digest
+
+    Raises:
+        UnsupportedArchiveError: If the archive uses features that cannot be
+            hashed natively
+
+    """
+    digest = hashlib.sha256()
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            _NarWriter(digest).archive(_unpacked_root(_read_zip(zf)))
+        return digest.hexdigest()
+
+    with archive.open("rb") as f, tempfile.TemporaryFile() as spill:
+        root = _read_tar(f, spill)
+        _NarWriter(digest).archive(_unpacked_root(root))
+    return digest.hexdigest()
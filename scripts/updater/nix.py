@@ -1,9 +1,23 @@
 """Nix command wrappers for package updates."""
 
 import json
+import os
+import signal
 import subprocess
+import threading
+from collections.abc import Callable, Iterable
 from pathlib import Path
-from typing import cast
+from typing import Any, cast
+
+# Seconds to wait for a process group to exit after SIGTERM before SIGKILL.
+TERMINATE_TIMEOUT = 10
+
+# Serializes builds when several updaters run in one process (see
+# .github/ci/batch_update.py). Network-bound work runs concurrently, but
+# parallel `nix build` invocations would only contend for the same store
+# locks and builders. Reentrant so callers may hold it around a sequence
+# of builds.
+BUILD_LOCK = threading.RLock()
 
 
 class NixCommandError(Exception):
@@ -22,7 +36,10 @@ def run_command(
     Args:
         cmd: Command and arguments to run
         check: Whether to raise exception on non-zero exit
-        capture_output: Whether to capture stdout/stderr
+        capture_output: Whether to capture stdout/stderr. Otherwise the
+            combined output is printed through ``sys.stdout`` once the
+            command exits, so a caller that redirects it (like the batch
+            runner) sees it too
         cwd: Working directory for the command
 
     Returns:
@@ -33,13 +50,21 @@ def run_command(
 
     """
     try:
-        return subprocess.run(
+        if capture_output:
+            return subprocess.run(
+                cmd, check=check, capture_output=True, text=True, cwd=cwd
+            )
+        result = subprocess.run(
             cmd,
-            check=check,
-            capture_output=capture_output,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
             cwd=cwd,
+            check=False,
         )
+        print(result.stdout, end="")
+        if check:
+            result.check_returncode()
     except subprocess.CalledProcessError as e:
         msg = (
             f"Command failed: {' '.join(cmd)}\n"
@@ -50,6 +75,83 @@ def run_command(
         raise NixCommandError(
             msg,
         ) from e
+    return result
+
+
+def _terminate_process_group(proc: subprocess.Popen[str]) -> None:
+    """Terminate ``proc`` and everything it spawned."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            break
+        try:
+            proc.wait(timeout=TERMINATE_TIMEOUT)
+            break
+        except subprocess.TimeoutExpired:
+            continue
+    proc.wait()
+
+
+def run_command_until(
+    cmd: list[str],
+    match: Callable[[str], str | None],
+    *,
+    cwd: Path | None = None,
+) -> str | None:
+    """Run a command, scanning its output line by line as it is produced.
+
+    As soon as ``match`` returns a value for a line, the command and its
+    whole process group are killed and that value is returned, without
+    waiting for the command to finish on its own.
+
+    Args:
+        cmd: Command and arguments to run
+        match: Called with each output line (stdout and stderr merged);
+            returns a result to stop early, or None to keep reading
+        cwd: Working directory for the command
+
+    Returns:
+        The first non-None result of ``match``, or None if the command
+        exited successfully without producing one
+
+    Raises:
+        NixCommandError: If the command exits non-zero without a match
+
+    """
+    lines: list[str] = []
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        cwd=cwd,
+        start_new_session=True,
+    ) as proc:
+        if proc.stdout is None:
+            msg = "Popen did not provide an output pipe"
+            raise RuntimeError(msg)
+        try:
+            for line in proc.stdout:
+                lines.append(line)
+                result = match(line)
+                if result is not None:
+                    _terminate_process_group(proc)
+                    return result
+        except BaseException:
+            _terminate_process_group(proc)
+            raise
+        returncode = proc.wait()
+
+    if returncode != 0:
+        output = "".join(lines)
+        msg = (
+            f"Command failed: {' '.join(cmd)}\n"
+            f"Exit code: {returncode}\n"
+            f"Output: {output}"
+        )
+        raise NixCommandError(msg)
+    return None
 
 
 def nix_command(
@@ -102,6 +204,64 @@ def nix_eval(
     return result.stdout.strip()
 
 
+def attrs_apply_expr(paths: Iterable[str]) -> str:
+    """Return a Nix function selecting several attribute paths at once.
+
+    The function maps an attribute set to ``{ "<path>" = value; ... }`` for
+    every dotted path in ``paths``. Paths that are missing or whose value
+    throws evaluate to ``null`` instead of failing the whole evaluation.
+
+    Args:
+        paths: Dotted attribute paths (e.g., "version", "meta.changelog")
+
+    Returns:
+        Nix lambda suitable for ``nix eval --apply``
+
+    """
+    # Pass the paths as JSON so attribute names need no Nix quoting.
+    encoded = json.dumps(json.dumps({p: p.split(".") for p in paths}))
+    encoded = encoded.replace("${", "\\${")
+    return (
+        "root: let "
+        f"paths = builtins.fromJSON {encoded}; "
+        "get = builtins.foldl' (v: name: "
+        "if builtins.isAttrs v && v ? ${name} then v.${name} else null) root; "
+        "try = v: let r = builtins.tryEval v; in if r.success then r.value else null; "
+        "in builtins.mapAttrs (_: path: try (get path)) paths"
+    )
+
+
+def nix_eval_attrs(installable: str, paths: Iterable[str]) -> dict[str, Any]:
+    """Evaluate many attribute paths of an installable in one ``nix eval``.
+
+    Each ``nix eval`` locks and evaluates the flake from scratch, so asking
+    for ``version`` and ``meta.changelog`` (or the versions of many
+    packages) separately repeats that work per attribute. This evaluates
+    the installable once and returns every requested path in a single JSON
+    document.
+
+    Args:
+        installable: Flake attribute to start from (e.g., ".#packages.x86_64-linux")
+        paths: Dotted attribute paths below ``installable``
+
+    Returns:
+        Mapping of each path to its value, or None if it is missing or
+        fails to evaluate
+
+    Example:
+        >>> nix_eval_attrs(".#codex", ["version", "meta.changelog"])
+        {'version': '1.2.3', 'meta.changelog': 'https://...'}
+
+    """
+    paths = list(paths)
+    if not paths:
+        return {}
+    result = nix_command(
+        ["eval", installable, "--json", "--apply", attrs_apply_expr(paths)]
+    )
+    return cast("dict[str, Any]", json.loads(result.stdout))
+
+
 def nix_build(
     attr: str,
     *,
@@ -118,7 +278,46 @@ def nix_build(
 
     """
     args = ["build", "--log-format", "bar-with-logs", attr]
-    return nix_command(args, check=check)
+    with BUILD_LOCK:
+        return nix_command(args, check=check)
+
+
+def nix_build_until(
+    attr: str | list[str],
+    match: Callable[[str], str | None],
+    *,
+    keep_going: bool = False,
+) -> str | None:
+    """Build Nix packages, stopping as soon as ``match`` finds a result.
+
+    Used to abort dummy-hash builds the moment the ``got: sha256-...`` line
+    is printed instead of waiting for Nix to tear down the build.
+
+    Args:
+        attr: Flake attribute(s) to build (e.g., ".#package")
+        match: Called with each output line; see :func:`run_command_until`
+        keep_going: Whether to keep building other derivations after one fails
+
+    Returns:
+        The first result of ``match``, or None if the build succeeded
+
+    Raises:
+        NixCommandError: If the build fails without a match
+
+    """
+    attrs = [attr] if isinstance(attr, str) else attr
+    cmd = [
+        "nix",
+        "--experimental-features",
+        "nix-command flakes",
+        "build",
+        "--log-format",
+        "bar-with-logs",
+    ]
+    if keep_going:
+        cmd.append("--keep-going")
+    with BUILD_LOCK:
+        return run_command_until([*cmd, *attrs], match)
 
 
 def nix_store_prefetch_file(url: str, hash_type: str = "sha256") -> str:
@@ -164,10 +363,9 @@ def nix_prefetch_url(url: str, *, unpack: bool = False) -> str:
     args.append(url)
 
     result = run_command(args)
-    # nix-prefetch-url returns base32-encoded hash, convert to SRI
-    hash_b32 = result.stdout.strip()
+    # nix-prefetch-url returns a base32-encoded hash; convert it in-process
+    # rather than paying for another nix startup with `nix hash convert`.
+    # Imported here because updater.hash itself depends on this module.
+    from .hash import nix_base32_to_sri  # noqa: PLC0415
 
-    # Convert to SRI format by using nix hash convert
-    convert_args = ["hash", "convert", "--hash-algo", "sha256", hash_b32]
-    convert_result = nix_command(convert_args)
-    return convert_result.stdout.strip()
+    return nix_base32_to_sri(result.stdout.strip())
@@ -5,7 +5,8 @@ import subprocess
 import tarfile
 import tempfile
 from pathlib import Path
-from urllib.request import urlretrieve
+
+from .download import cached_download
 
 
 def extract_or_generate_lockfile(
@@ -16,8 +17,9 @@ def extract_or_generate_lockfile(
 ) -> bool:
     """Extract package-lock.json from npm tarball or generate it.
 
-    Downloads the npm tarball, checks if it contains a package-lock.json,
-    and either extracts it or generates one using npm.
+    Downloads the npm tarball (or reuses it from the download cache), checks
+    if it contains a package-lock.json, and either extracts it or generates
+    one using npm.
 
     Args:
         tarball_url: URL to the npm package tarball
@@ -32,10 +34,9 @@ def extract_or_generate_lockfile(
 
     with tempfile.TemporaryDirectory() as tmpdir:
         tmpdir_path = Path(tmpdir)
-        tarball_path = tmpdir_path / "package.tgz"
-        urlretrieve(tarball_url, tarball_path)
+        tarball = cached_download(tarball_url)
 
-        with tarfile.open(tarball_path, "r:gz") as tar:
+        with tarfile.open(tarball.path, "r:gz") as tar:
             tar.extractall(tmpdir_path, filter="data")
 
         package_dir = tmpdir_path / "package"
@@ -55,12 +56,18 @@ def extract_or_generate_lockfile(
 
         run_env = {**os.environ, **(env or {})}
 
-        subprocess.run(
+        # Printed through sys.stdout so batch runs keep it with this package.
+        result = subprocess.run(
             ["npm", "install", "--package-lock-only", "--ignore-scripts"],
             cwd=package_dir,
             env=run_env,
-            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            check=False,
         )
+        print(result.stdout, end="")
+        result.check_returncode()
 
         new_lock = package_dir / "package-lock.json"
         if new_lock.exists():
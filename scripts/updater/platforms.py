@@ -1,23 +1,139 @@
-"""Multi-platform hash calculation utilities for Nix package updaters."""
+"""Multi-platform hash calculation utilities for Nix package updaters.
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+All platform hashes in a process are computed on one shared
+:class:`HashExecutor`, so running many updaters at once (see
+.github/ci/batch_update.py) keeps a global cap on concurrent downloads
+instead of every call starting a pool as wide as its platform list. The
+limits can be tuned with environment variables:
 
+``UPDATER_HASH_NETWORK_LIMIT``
+    Concurrent in-process downloads (default 6)
+``UPDATER_HASH_STORE_LIMIT``
+    Concurrent Nix store writes, i.e. ``add_to_store`` prefetches (default 2)
+``UPDATER_HASH_QUEUE``
+    Jobs allowed to wait for a worker before submitters block (default 64)
+"""
+
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from .artifacts import lookup_artifact_hash
 from .hash import calculate_url_hash
 
+DEFAULT_NETWORK_LIMIT = 6
+DEFAULT_STORE_LIMIT = 2
+DEFAULT_QUEUE_SIZE = 64
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer from the environment."""
+    value = os.environ.get(name, "")
+    try:
+        return max(1, int(value)) if value else default
+    except ValueError:
+        return default
+
+
+class HashExecutor:
+    """Bounded thread pools shared by all platform hash calculations.
+
+    Flat downloads hashed in process and Nix store writes run on separate
+    pools of ``network_limit`` and ``store_limit`` threads, so a burst of
+    large ``nix store prefetch-file`` calls waits for a store worker without
+    occupying the threads the cheap streaming hashes run on (and vice
+    versa). At most ``max_queued`` jobs wait for a worker; further
+    submissions block until one finishes.
+    """
+
+    def __init__(
+        self,
+        *,
+        network_limit: int = DEFAULT_NETWORK_LIMIT,
+        store_limit: int = DEFAULT_STORE_LIMIT,
+        max_queued: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        """Create the pools and the queue limit."""
+        self._network = ThreadPoolExecutor(
+            max_workers=network_limit, thread_name_prefix="platform-hash"
+        )
+        self._store = ThreadPoolExecutor(
+            max_workers=store_limit, thread_name_prefix="platform-hash-store"
+        )
+        self._slots = threading.BoundedSemaphore(
+            network_limit + store_limit + max_queued
+        )
+
+    @classmethod
+    def from_env(cls) -> "HashExecutor":
+        """Create an executor configured from the environment."""
+        return cls(
+            network_limit=_env_int("UPDATER_HASH_NETWORK_LIMIT", DEFAULT_NETWORK_LIMIT),
+            store_limit=_env_int("UPDATER_HASH_STORE_LIMIT", DEFAULT_STORE_LIMIT),
+            max_queued=_env_int("UPDATER_HASH_QUEUE", DEFAULT_QUEUE_SIZE),
+        )
+
+    def submit(self, fn: Callable[[], str], *, store: bool = False) -> Future[str]:
+        """Queue ``fn``, blocking while the queue is full.
+
+        Args:
+            fn: Job to run; returns a hash
+            store: Whether the job writes to the Nix store
+
+        Returns:
+            Future for the job's result
+
+        """
+        pool = self._store if store else self._network
+        self._slots.acquire()
+        try:
+            future = pool.submit(fn)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self) -> None:
+        """Wait for queued jobs and stop the worker threads."""
+        self._network.shutdown(wait=True)
+        self._store.shutdown(wait=True)
+
+
+_executor: HashExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor() -> HashExecutor:
+    """Return the process-wide executor, creating it from the environment."""
+    global _executor  # noqa: PLW0603
+    with _executor_lock:
+        if _executor is None:
+            _executor = HashExecutor.from_env()
+        return _executor
+
 
 def calculate_platform_hashes(
     url_template: str,
     platforms: dict[str, str],
+    *,
+    add_to_store: bool = False,
+    immutable: bool = False,
     **format_kwargs: str,
 ) -> dict[str, str]:
     """Calculate hashes for each platform using URL template.
 
-    Fetches hashes in parallel using a thread pool for faster execution.
+    Hashes already in the repository-wide artifact index are reused (see
+    :func:`updater.hash.calculate_url_hash` for when); the rest are fetched
+    in parallel on the shared :class:`HashExecutor`.
 
     Args:
         url_template: URL template with {platform} placeholder and optional other placeholders
         platforms: Dictionary mapping nix platform (e.g., "x86_64-linux") to platform-specific
                    value used in the URL (e.g., "linux/amd64", "aarch64.app.tar.gz")
+        add_to_store: Whether to add the downloads to the Nix store
+        immutable: Whether the URLs are versioned and their content never changes
         **format_kwargs: Additional format arguments for the URL template
 
     Returns:
@@ -36,22 +152,38 @@ def calculate_platform_hashes(
         {'x86_64-linux': 'sha256-...', 'aarch64-darwin': 'sha256-...'}
 
     """
+    urls = {
+        nix_platform: url_template.format(platform=value, **format_kwargs)
+        for nix_platform, value in platforms.items()
+    }
+    hashes: dict[str, str] = {}
+    if not add_to_store:
+        # Artifacts already pinned elsewhere in the flake need no job at all.
+        for nix_platform, url in urls.items():
+            known = lookup_artifact_hash(url, immutable=immutable)
+            if known is not None:
+                hashes[nix_platform] = known
+        if hashes:
+            print(f"Reusing indexed hashes for {', '.join(sorted(hashes))}")
+
+    def fetch_hash(url: str) -> Callable[[], str]:
+        return lambda: calculate_url_hash(
+            url, add_to_store=add_to_store, immutable=immutable
+        )
 
-    def fetch_hash(nix_platform: str, platform_value: str) -> tuple[str, str]:
-        url = url_template.format(platform=platform_value, **format_kwargs)
-        hash_value = calculate_url_hash(url)
+    pending = {p: url for p, url in urls.items() if p not in hashes}
+    if pending:
+        print(f"Fetching hashes for {len(pending)} platforms in parallel...")
+    executor = get_hash_executor()
+    futures = {
+        executor.submit(fetch_hash(url), store=add_to_store): nix_platform
+        for nix_platform, url in pending.items()
+    }
+    # Progress is printed from the calling thread so it stays with the
+    # updater's own output when several updaters share the executor.
+    for future in as_completed(futures):
+        nix_platform = futures[future]
+        hashes[nix_platform] = future.result()
         print(f"Fetched hash for {nix_platform}")
-        return nix_platform, hash_value
-
-    print(f"Fetching hashes for {len(platforms)} platforms in parallel...")
-    hashes = {}
-    with ThreadPoolExecutor(max_workers=len(platforms)) as executor:
-        futures = {
-            executor.submit(fetch_hash, nix_platform, platform_value): nix_platform
-            for nix_platform, platform_value in platforms.items()
-        }
-        for future in as_completed(futures):
-            nix_platform, hash_value = future.result()
-            hashes[nix_platform] = hash_value
 
     return hashes
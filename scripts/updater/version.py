@@ -1,15 +1,155 @@
 """Version fetching from various sources (GitHub, npm, custom APIs)."""
 
+import json
+import os
 import re
+import threading
+import time
+import urllib.error
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
 from typing import cast
 
-from .http import fetch_json, fetch_text
-from .nix import run_command
+from .http import fetch_json, fetch_text, post_json
+
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Maximum number of repositories resolved by one GraphQL query.
+GRAPHQL_BATCH_SIZE = 50
+
+# Seconds the first latest-release lookup waits for concurrent lookups to
+# join its GraphQL query.
+GRAPHQL_BATCH_WINDOW = 0.05
+
+_Repo = tuple[str, str]
+
+
+def _latest_release_query(repos: list[_Repo]) -> str:
+    """Build a GraphQL query with one aliased repository field per repo."""
+    fields = "\n".join(
+        f"  r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)})"
+        " { latestRelease { tagName } }"
+        for i, (owner, repo) in enumerate(repos)
+    )
+    return f"query {{\n{fields}\n}}"
+
+
+def fetch_github_latest_releases(repos: Iterable[_Repo]) -> dict[_Repo, str | None]:
+    """Fetch the latest release tags of many repositories via GraphQL.
+
+    Repositories are resolved ``GRAPHQL_BATCH_SIZE`` at a time with aliased
+    ``repository { latestRelease { tagName } }`` fields, so a whole sweep
+    costs a handful of requests. GraphQL requires authentication; without
+    ``GITHUB_TOKEN`` nothing is fetched.
+
+    Args:
+        repos: (owner, repo) pairs
+
+    Returns:
+        Mapping of (owner, repo) to its latest release tag, or None where
+        the tag could not be resolved (missing token, request failure,
+        per-repository error or no release); callers fall back to REST
+
+    """
+    unique = list(dict.fromkeys(repos))
+    results: dict[_Repo, str | None] = dict.fromkeys(unique)
+    if not os.environ.get("GITHUB_TOKEN"):
+        return results
+
+    for start in range(0, len(unique), GRAPHQL_BATCH_SIZE):
+        batch = unique[start : start + GRAPHQL_BATCH_SIZE]
+        try:
+            response = post_json(
+                GITHUB_GRAPHQL_URL, {"query": _latest_release_query(batch)}
+            )
+        except (urllib.error.URLError, ValueError) as e:
+            print(f"GraphQL latest-release lookup failed: {e}")
+            continue
+        data = response.get("data") if isinstance(response, dict) else None
+        if not isinstance(data, dict):
+            continue
+        for i, repo in enumerate(batch):
+            node = data.get(f"r{i}") or {}
+            release = node.get("latestRelease") or {}
+            results[repo] = release.get("tagName")
+    return results
+
+
+class _LatestReleaseBatcher:
+    """Coalesce concurrent latest-release lookups into GraphQL queries.
+
+    The first caller of a batch waits ``GRAPHQL_BATCH_WINDOW`` for other
+    threads (e.g. concurrent updaters in one process) to add their
+    repositories, then resolves them all with one query and hands each
+    caller its own result.
+    """
+
+    def __init__(self, window: float = GRAPHQL_BATCH_WINDOW) -> None:
+        self._window = window
+        self._lock = threading.Lock()
+        self._pending: dict[_Repo, Future[str | None]] = {}
+
+    def resolve(self, owner: str, repo: str) -> str | None:
+        """Return the latest release tag of ``owner/repo``, or None."""
+        with self._lock:
+            leader = not self._pending
+            future = self._pending.get((owner, repo))
+            if future is None:
+                future = self._pending[owner, repo] = Future()
+            full = len(self._pending) >= GRAPHQL_BATCH_SIZE
+        if leader and not full:
+            time.sleep(self._window)
+        if leader or full:
+            self._flush()
+        return future.result()
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        try:
+            for repo, tag in fetch_github_latest_releases(batch).items():
+                batch[repo].set_result(tag)
+        finally:
+            # Never leave a waiting caller behind; None means "use REST".
+            for future in batch.values():
+                if not future.done():
+                    future.set_result(None)
+
+
+_release_batcher = _LatestReleaseBatcher()
+_batching_depth = 0
+_batching_lock = threading.Lock()
+
+
+@contextmanager
+def batched_release_lookups() -> Iterator[None]:
+    """Share GraphQL queries between concurrent latest-release lookups.
+
+    Only worth it where many lookups run at once (discovery, the batch
+    runner): a single lookup is cheaper as a conditional REST request,
+    which the HTTP cache revalidates for free with ``304 Not Modified``.
+    Applies to all threads of the process while the block is active.
+    """
+    global _batching_depth  # noqa: PLW0603
+    with _batching_lock:
+        _batching_depth += 1
+    try:
+        yield
+    finally:
+        with _batching_lock:
+            _batching_depth -= 1
 
 
 def fetch_github_latest_release(owner: str, repo: str) -> str:
     """Fetch the latest release version from GitHub.
 
+    Uses the conditional (cached) REST endpoint. Inside
+    :func:`batched_release_lookups` with ``GITHUB_TOKEN`` set, the lookup
+    instead goes through a GraphQL query shared with concurrent lookups
+    (see :func:`fetch_github_latest_releases`), falling back to REST when
+    that cannot resolve the repository.
+
     Args:
         owner: Repository owner
         repo: Repository name
@@ -18,6 +158,11 @@ def fetch_github_latest_release(owner: str, repo: str) -> str:
         Latest release version (without 'v' prefix)
 
     """
+    if _batching_depth and os.environ.get("GITHUB_TOKEN"):
+        tag = _release_batcher.resolve(owner, repo)
+        if tag is not None:
+            return tag.lstrip("v")
+
     url = f"https://api.github.com/repos/{owner}/{repo}/releases/latest"
     data = fetch_json(url)
     if not isinstance(data, dict):
@@ -32,6 +177,10 @@ def fetch_github_latest_release(owner: str, repo: str) -> str:
 def fetch_npm_version(package: str) -> str:
     """Fetch the latest version from npm registry.
 
+    Queries the registry directly over the shared HTTP session rather than
+    spawning ``npm view``, which would start node and open its own
+    connection for every lookup.
+
     Args:
         package: npm package name
 
@@ -39,19 +188,12 @@ def fetch_npm_version(package: str) -> str:
         Latest version
 
     """
-    # Try using npm command first
-    try:
-        cmd = ["npm", "view", package, "version"]
-        result = run_command(cmd)
-        return result.stdout.strip()
-    except (FileNotFoundError, OSError):
-        # npm command not available, fallback to registry API
-        url = f"https://registry.npmjs.org/{package}/latest"
-        data = fetch_json(url)
-        if not isinstance(data, dict):
-            msg = f"Expected dict from npm registry, got {type(data)}"
-            raise TypeError(msg) from None
-        return cast("str", data["version"])
+    url = f"https://registry.npmjs.org/{package}/latest"
+    data = fetch_json(url)
+    if not isinstance(data, dict):
+        msg = f"Expected dict from npm registry, got {type(data)}"
+        raise TypeError(msg)
+    return cast("str", data["version"])
 
 
 # Parse versions into numeric components for proper comparison
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Exercise the GitHub API rate limiting of ``updater.http`` locally.
+
+Starts an ``http.server`` that answers like a rate-limited GitHub API and
+runs the shared HTTP session against it: a 429 with ``Retry-After``, a
+403 secondary limit, a primary limit exhausted by a 403 and by an
+``X-RateLimit-Remaining: 0`` success, and a plain 403 that must not be
+retried. Needs no network or token and finishes in a few seconds. Exits
+non-zero if any scenario misbehaves.
+"""
+
+import sys
+import threading
+import time
+import urllib.error
+from collections.abc import Callable
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from updater.http import GitHubRateLimiter, HttpSession
+
+SECONDARY_BODY = b'{"message": "You have exceeded a secondary rate limit."}'
+
+
+@dataclass(frozen=True)
+class Reply:
+    """One scripted response of the fake API."""
+
+    status: int = 200
+    body: bytes = b"{}"
+    retry_after: int | None = None
+    remaining: int | None = None
+    reset_in: float = 1.0
+
+
+# Path -> replies served in order; the last one repeats.
+SCENARIOS: dict[str, list[Reply]] = {
+    "/retry-after": [Reply(429, retry_after=1), Reply()],
+    "/secondary": [Reply(403, SECONDARY_BODY), Reply(403, SECONDARY_BODY), Reply()],
+    "/primary-403": [Reply(403, remaining=0), Reply(remaining=4999)],
+    "/exhausted": [Reply(remaining=0), Reply(remaining=4999)],
+    "/forbidden": [Reply(403, b'{"message": "Resource not accessible"}')],
+}
+
+
+class FakeGitHub(BaseHTTPRequestHandler):
+    """Serve :data:`SCENARIOS` and record when each request arrived."""
+
+    protocol_version = "HTTP/1.1"
+    arrivals: dict[str, list[float]] = {}  # noqa: RUF012 - shared by all handlers
+    lock = threading.Lock()
+
+    def do_GET(self) -> None:
+        """Answer with the next reply scripted for the path."""
+        with self.lock:
+            seen = self.arrivals.setdefault(self.path, [])
+            seen.append(time.time())
+            replies = SCENARIOS[self.path]
+            reply = replies[min(len(seen), len(replies)) - 1]
+        self.send_response(reply.status)
+        if reply.retry_after is not None:
+            self.send_header("Retry-After", str(reply.retry_after))
+        if reply.remaining is not None:
+            self.send_header("X-RateLimit-Remaining", str(reply.remaining))
+            reset = int(time.time() + reply.reset_in)
+            self.send_header("X-RateLimit-Reset", str(reset))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply.body)))
+        self.end_headers()
+        self.wfile.write(reply.body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Keep the check's output to its own results."""
+
+
+class LocalSession(HttpSession):
+    """Session that applies its rate limiter to every host, not just GitHub."""
+
+    def _limiter_for(self, url: str) -> GitHubRateLimiter | None:  # noqa: ARG002
+        return self.rate_limiter
+
+
+def check(name: str, condition: bool, detail: str) -> bool:  # noqa: FBT001
+    """Print and return the outcome of one scenario."""
+    print(f"{'OK' if condition else 'FAIL'} {name}: {detail}")
+    return condition
+
+
+def run(
+    base_url: str, path: str, *, fetches: int = 1
+) -> tuple[float, urllib.error.HTTPError | None]:
+    """Fetch ``path`` on a fresh session; return the elapsed time and any error."""
+    limiter = GitHubRateLimiter(backoff_base=0.2, max_wait=30)
+    session = LocalSession(rate_limiter=limiter)
+    start = time.monotonic()
+    try:
+        for _ in range(fetches):
+            session.request(base_url + path, cache=False)
+    except urllib.error.HTTPError as e:
+        return time.monotonic() - start, e
+    finally:
+        session.close()
+    return time.monotonic() - start, None
+
+
+def scenarios(base_url: str) -> list[Callable[[], bool]]:
+    """Return the checks to run against the server at ``base_url``."""
+    arrivals = FakeGitHub.arrivals
+
+    def retry_after() -> bool:
+        elapsed, error = run(base_url, "/retry-after")
+        return check(
+            "429 with Retry-After",
+            error is None and len(arrivals["/retry-after"]) == 2 and elapsed >= 1,  # noqa: PLR2004
+            f"{len(arrivals['/retry-after'])} requests in {elapsed:.1f}s",
+        )
+
+    def secondary() -> bool:
+        elapsed, error = run(base_url, "/secondary")
+        # Two jittered backoffs of at least 0.2s and 0.4s.
+        return check(
+            "secondary limit backoff",
+            error is None and len(arrivals["/secondary"]) == 3 and elapsed >= 0.6,  # noqa: PLR2004
+            f"{len(arrivals['/secondary'])} requests in {elapsed:.1f}s",
+        )
+
+    def primary_403() -> bool:
+        elapsed, error = run(base_url, "/primary-403")
+        times = arrivals["/primary-403"]
+        # The retry must wait for X-RateLimit-Reset, not go out at once.
+        return check(
+            "403 with X-RateLimit-Remaining: 0",
+            error is None and len(times) == 2 and times[1] - times[0] >= 0.5,  # noqa: PLR2004
+            f"{len(times)} requests in {elapsed:.1f}s",
+        )
+
+    def exhausted() -> bool:
+        elapsed, error = run(base_url, "/exhausted", fetches=2)
+        times = arrivals["/exhausted"]
+        # The second request is held back until the reported reset.
+        return check(
+            "waiting on X-RateLimit-Remaining: 0",
+            error is None and len(times) == 2 and times[1] - times[0] >= 0.5,  # noqa: PLR2004
+            f"{len(times)} requests in {elapsed:.1f}s",
+        )
+
+    def forbidden() -> bool:
+        _, error = run(base_url, "/forbidden")
+        status = error.code if error is not None else None
+        return check(
+            "plain 403 is not retried",
+            status == 403 and len(arrivals["/forbidden"]) == 1,  # noqa: PLR2004
+            f"status {status} after {len(arrivals['/forbidden'])} request(s)",
+        )
+
+    return [retry_after, secondary, primary_403, exhausted, forbidden]
+
+
+def main() -> None:
+    """Run every scenario against a local fake API."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        results = [scenario() for scenario in scenarios(base_url)]
+    finally:
+        server.shutdown()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Cross-check native unpacked hashes against ``nix-prefetch-url --unpack``.
+
+Pass one or more archive URLs (for example every ``fetchzip``/
+``fetchFromGitHub`` source in the flake) to confirm that
+``updater.nar`` produces the same hash as Nix. With ``--corpus`` a set of
+generated archives is checked as well, covering the cases the serializer
+has to get right: tar (gzip, bzip2, xz) and zip, a single top-level
+directory or several entries, executable files, symlinks, empty files and
+directories. Exits non-zero on any mismatch or on archives the native
+serializer cannot handle.
+
+Native hashing is only used by the updaters with ``UPDATER_NATIVE_NAR=1``;
+run this on a machine with Nix before enabling it.
+"""
+
+import argparse
+import io
+import stat
+import sys
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Literal
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from updater.download import cached_download
+from updater.hash import hex_to_sri
+from updater.nar import UnsupportedArchiveError, nar_sha256
+from updater.nix import nix_prefetch_url
+
+# Corpus entries: path -> (kind, payload, mode). Kinds are "file", "dir"
+# and "symlink" (payload is the link target).
+_Entry = tuple[str, bytes, int]
+_TarMode = Literal["w:gz", "w:bz2", "w:xz"]
+
+TAR_FORMATS: tuple[tuple[str, _TarMode], ...] = (
+    ("tar.gz", "w:gz"),
+    ("tar.bz2", "w:bz2"),
+    ("tar.xz", "w:xz"),
+)
+
+CORPUS_TREE: dict[str, _Entry] = {
+    "README.md": ("file", b"# corpus\n", 0o644),
+    "bin/": ("dir", b"", 0o755),
+    "bin/tool": ("file", b"#!/bin/sh\necho tool\n", 0o755),
+    "bin/tool-link": ("symlink", b"tool", 0o777),
+    "lib/": ("dir", b"", 0o755),
+    "lib/data.bin": ("file", bytes(range(256)) * 300, 0o644),
+    "lib/empty": ("file", b"", 0o600),
+    "lib/nested/": ("dir", b"", 0o755),
+    "lib/nested/deep.txt": ("file", b"deep\n", 0o444),
+    "lib/up-link": ("symlink", b"../README.md", 0o777),
+    "empty-dir/": ("dir", b"", 0o755),
+    "Zebra.txt": ("file", b"sorted by bytes, not case\n", 0o644),
+    "a b.txt": ("file", b"space in name\n", 0o644),
+}
+
+
+def _write_tar(path: Path, entries: dict[str, _Entry], mode: _TarMode) -> None:
+    with tarfile.open(path, mode) as tar:
+        for name, (kind, payload, perm) in entries.items():
+            info = tarfile.TarInfo(name.rstrip("/"))
+            info.mode = perm
+            if kind == "dir":
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+            elif kind == "symlink":
+                info.type = tarfile.SYMTYPE
+                info.linkname = payload.decode()
+                tar.addfile(info)
+            else:
+                info.size = len(payload)
+                tar.addfile(info, io.BytesIO(payload))
+
+
+def _write_zip(path: Path, entries: dict[str, _Entry]) -> None:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, (kind, payload, perm) in entries.items():
+            info = zipfile.ZipInfo(name)
+            info.create_system = 3  # Unix, so external_attr holds the mode
+            type_bits = {"dir": stat.S_IFDIR, "symlink": stat.S_IFLNK}
+            info.external_attr = (type_bits.get(kind, stat.S_IFREG) | perm) << 16
+            zf.writestr(info, payload)
+
+
+def build_corpus(directory: Path) -> list[Path]:
+    """Write the generated test archives into ``directory``."""
+    rooted = {f"corpus-1.0/{name}": entry for name, entry in CORPUS_TREE.items()}
+    rooted = {"corpus-1.0/": ("dir", b"", 0o755), **rooted}
+    archives = []
+    for suffix, mode in TAR_FORMATS:
+        path = directory / f"rooted.{suffix}"
+        _write_tar(path, rooted, mode)
+        archives.append(path)
+    flat = directory / "flat.tar.gz"
+    _write_tar(flat, CORPUS_TREE, "w:gz")
+    archives.append(flat)
+    for name, entries in (("rooted.zip", rooted), ("flat.zip", CORPUS_TREE)):
+        path = directory / name
+        _write_zip(path, entries)
+        archives.append(path)
+    return archives
+
+
+def compare(label: str, archive: Path, nix_url: str) -> bool:
+    """Return True if the native and Nix hashes of ``archive`` agree."""
+    try:
+        native = hex_to_sri(nar_sha256(archive))
+    except UnsupportedArchiveError as e:
+        print(f"UNSUPPORTED {label}: {e}")
+        return False
+    expected = nix_prefetch_url(nix_url, unpack=True)
+    if native != expected:
+        print(f"MISMATCH {label}\n  native: {native}\n  nix:    {expected}")
+        return False
+    print(f"OK {native} {label}")
+    return True
+
+
+def verify(url: str) -> bool:
+    """Return True if the native and Nix hashes of ``url`` agree."""
+    return compare(url, cached_download(url).path, url)
+
+
+def verify_corpus() -> list[bool]:
+    """Check every generated corpus archive."""
+    with tempfile.TemporaryDirectory(prefix="nar-corpus-") as tmp:
+        return [
+            compare(archive.name, archive, archive.as_uri())
+            for archive in build_corpus(Path(tmp))
+        ]
+
+
+def main() -> None:
+    """Verify the corpus and every URL given on the command line."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("urls", nargs="*", help="archive URLs to check")
+    parser.add_argument(
+        "--corpus", action="store_true", help="also check generated archives"
+    )
+    args = parser.parse_args()
+    if not args.urls and not args.corpus:
+        parser.error("pass archive URLs and/or --corpus")
+
+    results = verify_corpus() if args.corpus else []
+    results += [verify(url) for url in args.urls]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()